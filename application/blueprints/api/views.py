@@ -0,0 +1,66 @@
+from flask import Blueprint, jsonify, request, url_for
+from sqlalchemy.orm import selectinload
+
+from application.extensions import db
+from application.models import LocalPlan, LocalPlanTimetable
+from application.spatial import boundary_index
+
+api = Blueprint("api", __name__, url_prefix="/api")
+
+
+@api.record_once
+def configure_boundary_index(state):
+    boundary_index.check_interval = state.app.config.get(
+        "BOUNDARY_INDEX_CHECK_INTERVAL", boundary_index.check_interval
+    )
+
+
+@api.get("/plans-at")
+def plans_at():
+    try:
+        lat = float(request.args["lat"])
+        long = float(request.args["long"])
+    except (KeyError, ValueError):
+        return (
+            jsonify({"error": "lat and long are required and must be numbers"}),
+            400,
+        )
+    if not (-90 <= lat <= 90 and -180 <= long <= 180):
+        return jsonify({"error": "lat or long out of range"}), 400
+
+    boundaries = boundary_index.boundaries_at(db.session, long, lat)
+    if boundaries:
+        plans = (
+            LocalPlan.query.options(
+                selectinload(LocalPlan.organisations),
+                selectinload(LocalPlan.timetable).joinedload(
+                    LocalPlanTimetable.event_type
+                ),
+            )
+            .filter(LocalPlan.local_plan_boundary.in_(boundaries))
+            .order_by(LocalPlan.name)
+            .all()
+        )
+    else:
+        plans = []
+
+    return jsonify(
+        {
+            "lat": lat,
+            "long": long,
+            "plans": [
+                {
+                    "reference": plan.reference,
+                    "name": plan.name,
+                    "status": plan.status.value if plan.status else None,
+                    "adopted-date": plan.adopted_date or None,
+                    "local-plan-boundary": plan.local_plan_boundary,
+                    "organisations": [org.organisation for org in plan.organisations],
+                    "url": url_for(
+                        "local_plan.get_plan", reference=plan.reference, _external=True
+                    ),
+                }
+                for plan in plans
+            ],
+        }
+    )
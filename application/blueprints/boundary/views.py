@@ -3,6 +3,7 @@ from geojson import loads
 from shapely.geometry import MultiPolygon, shape
 from shapely.geometry.polygon import Polygon
 from slugify import slugify
+from sqlalchemy.orm import joinedload, undefer_group
 
 from application.blueprints.boundary.forms import BoundaryForm, EditBoundaryForm
 from application.extensions import db
@@ -84,7 +85,9 @@ def edit(local_plan_reference, reference):
     plan = LocalPlan.query.get(local_plan_reference)
     if plan is None:
         return abort(404)
-    lp_boundary = LocalPlanBoundary.query.get(reference)
+    lp_boundary = LocalPlanBoundary.query.options(undefer_group("geography")).get(
+        reference
+    )
     if lp_boundary is None:
         return abort(404)
 
@@ -164,7 +167,9 @@ def edit(local_plan_reference, reference):
 
 @boundary.route("/<string:reference>")
 def get_boundary(local_plan_reference, reference):
-    plan = LocalPlan.query.get(local_plan_reference)
+    plan = LocalPlan.query.options(
+        joinedload(LocalPlan.boundary).undefer_group("geography")
+    ).get(local_plan_reference)
     if plan is None:
         abort(404)
     boundary = LocalPlanBoundary.query.get(reference)
@@ -145,7 +145,22 @@ def edit(local_plan_reference, reference):
 
     if form.validate_on_submit():
         doc.organisations.clear()
+        document_url = doc.document_url
+        documentation_url = doc.documentation_url
         document = populate_object(form, doc)
+        if document.document_url != document_url:
+            # the fingerprint and link check were of the file at the old url
+            document.content_hash = None
+            document.content_size = None
+            document.content_hashed_date = None
+            document.link_status = None
+            document.link_final_url = None
+            document.link_content_type = None
+            document.link_content_length = None
+            document.link_error = None
+            document.link_checked_date = None
+        if document.documentation_url != documentation_url:
+            document.documentation_link_status = None
         db.session.add(document)
         db.session.commit()
         return redirect(
@@ -2,6 +2,7 @@ import csv
 import io
 
 from flask import Blueprint, Response
+from sqlalchemy.orm import joinedload
 
 from application.export import (
     LocalPlanBoundaryModel,
@@ -77,10 +78,16 @@ def export_local_plan_timetables():
 
 @export.get("/local-plan-boundary.csv")
 def export_boundaries():
-    local_plans = LocalPlan.query.filter(
-        LocalPlan.status.in_([Status.FOR_PLATFORM, Status.EXPORTED]),
-        LocalPlan.boundary_status.in_([Status.FOR_PLATFORM, Status.EXPORTED]),
-    ).all()
+    local_plans = (
+        LocalPlan.query.options(
+            joinedload(LocalPlan.boundary).undefer_group("geography")
+        )
+        .filter(
+            LocalPlan.status.in_([Status.FOR_PLATFORM, Status.EXPORTED]),
+            LocalPlan.boundary_status.in_([Status.FOR_PLATFORM, Status.EXPORTED]),
+        )
+        .all()
+    )
     data = []
     for plan in local_plans:
         model = LocalPlanBoundaryModel.model_validate(plan.boundary)
@@ -4,6 +4,7 @@ from datetime import datetime
 import geopandas as gpd
 from flask import Blueprint, abort, redirect, render_template, request, url_for
 from slugify import slugify
+from sqlalchemy.orm import joinedload, selectinload
 
 from application.blueprints.local_plan.forms import LocalPlanForm
 from application.extensions import db
@@ -27,7 +28,9 @@ def index():
 
 @local_plan.route("/<string:reference>")
 def get_plan(reference):
-    plan = LocalPlan.query.get(reference)
+    plan = LocalPlan.query.options(
+        joinedload(LocalPlan.boundary).undefer_group("geography")
+    ).get(reference)
     if plan is None:
         return abort(404)
 
@@ -50,6 +53,7 @@ def get_plan(reference):
         bounding_box = None
 
     document_counts = _get_document_counts(plan.documents)
+    link_health = _get_link_health(plan.documents)
 
     stage_urls = {}
 
@@ -75,6 +79,7 @@ def get_plan(reference):
         geography=geography,
         bounding_box=bounding_box,
         document_counts=document_counts,
+        link_health=link_health,
         stage_urls=stage_urls,
         events=events,
         breadcrumbs=breadcrumbs,
@@ -189,7 +194,9 @@ def archived_plans():
 @local_plan.route("/<string:reference>/geography/add", methods=["GET", "POST"])
 @login_required
 def add_geography(reference):
-    plan = LocalPlan.query.get(reference)
+    plan = LocalPlan.query.options(
+        selectinload(LocalPlan.organisations).undefer_group("geography")
+    ).get(reference)
     if plan is None:
         return abort(404)
 
@@ -272,6 +279,20 @@ def _get_document_counts(documents):
     return counts
 
 
+def _get_link_health(documents):
+    """Summarise the last check-links results for the plan's current documents"""
+    documents = [doc for doc in documents if doc.end_date is None]
+    checked = [doc for doc in documents if doc.link_checked_date is not None]
+    if not checked:
+        return None
+    return {
+        "working": len([doc for doc in checked if doc.link_ok]),
+        "broken": len([doc for doc in checked if not doc.link_ok]),
+        "not_checked": len(documents) - len(checked),
+        "checked_date": max(doc.link_checked_date for doc in checked),
+    }
+
+
 def _make_reference(form):
     reference = slugify(form.name.data)
     if LocalPlan.query.get(reference) is None:
@@ -1,157 +1,489 @@
 import csv
+import io
+import json
+import multiprocessing
 import os
 import subprocess
 import sys
-from collections import defaultdict
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
+from contextlib import contextmanager
 from datetime import datetime
+from functools import partial
 from pathlib import Path
 
 import click
 import requests
+import urllib3
 from flask import current_app
-from flask.cli import AppGroup
+from shapely import from_wkt
+from shapely.geometry import mapping, shape
 from slugify import slugify
-from sqlalchemy import not_, select, text
-from sqlalchemy.inspection import inspect
+from sqlalchemy import (
+    BigInteger,
+    DateTime,
+    Integer,
+    Text,
+    cast,
+    column,
+    delete,
+    func,
+    insert,
+    literal,
+    not_,
+    or_,
+    select,
+    text,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from application.extensions import db
+from application.fetch import HTTPCache, make_session
+from application.metrics import InstrumentedGroup, current_metrics, phase, verbose
 from application.models import (
+    CrawlCache,
+    DocumentCandidate,
     LocalPlan,
     LocalPlanBoundary,
     LocalPlanDocument,
     LocalPlanDocumentType,
+    LocalPlanEventType,
     Organisation,
+    ReferenceDataLoad,
     Status,
+    boundary_organisation,
     document_organisation,
+    local_plan_organisation,
+)
+from application.scraping import (
+    DocumentTypeMatcher,
+    HostLimiter,
+    PageCache,
+    check_link,
+    crawl_plan,
+    fingerprint,
 )
+from application.snapshot import load_snapshot, write_snapshot
 
-data_cli = AppGroup("data")
+data_cli = InstrumentedGroup("data")
 
 
-@data_cli.command("load-orgs")
-def load_orgs():
-    url = "https://datasette.planning.data.gov.uk/digital-land/organisation.json?_shape=array"
-    orgs = []
-    columns = set([column.name for column in inspect(Organisation).c])
-    while url:
-        resp = requests.get(url)
-        try:
-            url = resp.links.get("next").get("url")
-        except AttributeError:
-            url = None
-        orgs.extend(resp.json())
-
-    for org in orgs:
-        if not org["organisation"]:
-            print("Skipping invalid org", org["name"])
-            continue
-        if org["end_date"]:
-            print("Skipping end dated org", org["organisation"])
-            continue
-        if org["dataset"] not in [
-            "local-authority",
-            "development-corporation",
-            "national-park-authority",
-        ]:
-            print(
-                "Skipping org",
-                org["organisation"],
-                "as not a local authority, development corporation or national park authority",
-            )
-            continue
-        try:
-            org_obj = Organisation.query.get(org["organisation"])
-            if org_obj is None:
-                org_obj = Organisation()
-                print("Adding new org", org["organisation"])
-            else:
-                print("Updating org", org["organisation"])
-            for key, value in org.items():
-                if key in columns:
-                    v = value if value else None
-                    setattr(org_obj, key, v)
-            db.session.add(org_obj)
-            db.session.commit()
-        except Exception as e:
-            print(e)
-            continue
+ORGANISATION_DATASETS = [
+    "local-authority",
+    "development-corporation",
+    "national-park-authority",
+]
 
 
-@data_cli.command("load-plans")
-def load_plans():
-    current_file_path = Path(__file__).resolve()
-    data_directory = os.path.join(current_file_path.parent.parent, "data")
-    file_path = os.path.join(data_directory, "local-plan.csv")
+def refresh_option(
+    help="Write to the database even if nothing changed upstream since the last run",
+):
+    return click.option("--refresh", is_flag=True, default=False, help=help)
 
-    with open(file_path, mode="r") as file:
-        reader = csv.DictReader(file)
-        columns = set([column.name for column in inspect(LocalPlan).c])
 
-        for row in reader:
+REFRESH_OPTION = refresh_option()
+
+# options shared by the commands that fetch from council websites
+PER_HOST_OPTION = click.option(
+    "--per-host", type=int, default=2, help="Concurrent requests per host"
+)
+DELAY_OPTION = click.option(
+    "--delay", type=float, default=0.5, help="Seconds between requests to a host"
+)
+BACKGROUND_OPTION = click.option(
+    "--background",
+    is_flag=True,
+    default=False,
+    help="Run in a detached process logging to data/logs",
+)
+
+
+def plan_option(help):
+    return click.option("--plan", "plans", multiple=True, help=help)
+
+
+def workers_option(default, help):
+    return click.option("--workers", type=int, default=default, help=help)
+
+
+def timeout_option(default):
+    return click.option(
+        "--timeout", type=float, default=default, help="Read timeout in seconds"
+    )
+
+
+def batch_size_option(default, help):
+    return click.option("--batch-size", type=int, default=default, help=help)
+
+
+def _http_cache():
+    return HTTPCache(current_app.config["HTTP_CACHE_DIR"])
+
+
+@data_cli.command("load-orgs")
+@REFRESH_OPTION
+def load_orgs(refresh):
+    url = f"{current_app.config['DATASETTE_URL']}/digital-land/organisation.json?_shape=array"
+    with phase("fetch") as fetch, make_session() as session:
+        orgs, digest = _http_cache().get_json_pages(session, url)
+        fetch.rows = len(orgs)
+    if not refresh and _reference_data_unchanged(
+        "organisation", digest, "Organisations"
+    ):
+        return 0
+
+    # geographies are loaded separately by load-boundaries
+    table = Organisation.__table__
+    columns = [
+        column.name
+        for column in table.c
+        if column.name not in ("geometry", "geojson", "geometry_wkb", "point")
+    ]
+    rows = {}
+    skipped = 0
+    with phase("filter") as filtering:
+        for org in orgs:
+            if not org["organisation"]:
+                verbose("Skipping invalid org", org["name"])
+            elif org["end_date"]:
+                verbose("Skipping end dated org", org["organisation"])
+            elif org["dataset"] not in ORGANISATION_DATASETS:
+                verbose(
+                    "Skipping org",
+                    org["organisation"],
+                    "as not a local authority, development corporation or national park authority",
+                )
+            else:
+                row = {column: org.get(column) or None for column in columns}
+                # bulk inserts bypass the model's python side default
+                row["entry_date"] = row["entry_date"] or datetime.today().date()
+                rows[org["organisation"]] = row
+                continue
+            skipped += 1
+
+        existing = set(db.session.scalars(select(Organisation.organisation)))
+        inserted = len(rows.keys() - existing)
+        filtering.rows = len(orgs)
+
+    with phase("write") as write:
+        write.rows = len(rows)
+        if rows:
+            stmt = pg_insert(table)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.organisation],
+                set_={
+                    column: stmt.excluded[column]
+                    for column in columns
+                    if column != "organisation"
+                },
+            )
             try:
-                plan = LocalPlan.query.get(row["reference"])
-                if plan is None:
-                    print("Adding new plan", row["reference"])
-                    plan = LocalPlan()
-                    for key, value in row.items():
-                        k = key.lower().replace("-", "_")
-                        if k in columns:
-                            setattr(plan, k, value if value else None)
-                else:
-                    print("Updating plan", row["reference"])
-                    for key, value in row.items():
-                        k = key.lower().replace("-", "_")
-                        if k in columns and not k.endswith("date"):
-                            setattr(plan, k, value if value else None)
-                db.session.add(plan)
-                organisations = row.get("organisations")
-                for org in organisations.split(";") if organisations else []:
-                    organisation = Organisation.query.get(org)
-                    if (
-                        organisation is not None
-                        and organisation not in plan.organisations
-                    ):
-                        plan.organisations.append(organisation)
+                db.session.execute(stmt, list(rows.values()))
+                _record_reference_data_load("organisation", digest)
                 db.session.commit()
             except Exception as e:
-                print(f"Error processing row {row['reference']}: {e}")
                 db.session.rollback()
+                print("Error loading organisations:", e)
+                return 0
 
+    print(
+        f"Organisations: {inserted} inserted, {len(rows) - inserted} updated, {skipped} skipped"
+    )
+    return len(rows)
 
-@data_cli.command("load-boundaries")
-def load_boundaries():
-    from application.extensions import db
-
-    orgs = Organisation.query.all()
-    for org in orgs:
-        curie = f"statistical-geography:{org.statistical_geography}"
-        g = _get_geography(curie)
-        if g is not None:
-            print("Loading boundary for", org.organisation)
-            org.geometry = g["geometry"]
-            org.geojson = g["geojson"]
-            org.point = g["point"]
-            db.session.add(org)
+
+@data_cli.command("load-plans")
+@click.option(
+    "--file",
+    "file_path",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="Load plans from this CSV instead of data/local-plan.csv",
+)
+def load_plans(file_path):
+    if file_path is None:
+        current_file_path = Path(__file__).resolve()
+        data_directory = os.path.join(current_file_path.parent.parent, "data")
+        file_path = os.path.join(data_directory, "local-plan.csv")
+
+    with phase("preload"):
+        existing_plans = set(db.session.scalars(select(LocalPlan.reference)))
+        existing_orgs = set(db.session.scalars(select(Organisation.organisation)))
+
+    table = LocalPlan.__table__
+    plans = {}
+    plan_organisations = set()
+    with phase("read") as read, open(file_path, mode="r") as file:
+        reader = csv.DictReader(file)
+        fields = {
+            field: field.lower().replace("-", "_")
+            for field in reader.fieldnames
+            if field.lower().replace("-", "_") in table.c
+        }
+        for row in reader:
+            reference = row["reference"]
+            plans[reference] = {
+                column: row[field] if row[field] else None
+                for field, column in fields.items()
+            }
+            organisations = row.get("organisations")
+            for org in organisations.split(";") if organisations else []:
+                if org in existing_orgs:
+                    plan_organisations.add((reference, org))
+        read.rows = len(plans)
+
+    inserted = len(plans.keys() - existing_plans)
+    with phase("write") as write:
+        write.rows = len(plans) + len(plan_organisations)
+        try:
+            if plans:
+                # existing plans keep their dates, new plans take every column
+                stmt = pg_insert(table)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[table.c.reference],
+                    set_={
+                        column: stmt.excluded[column]
+                        for column in fields.values()
+                        if column != "reference" and not column.endswith("date")
+                    },
+                )
+                db.session.execute(stmt, list(plans.values()))
+            if plan_organisations:
+                db.session.execute(
+                    pg_insert(local_plan_organisation).on_conflict_do_nothing(),
+                    [
+                        {"local_plan": plan, "organisation": org}
+                        for plan, org in sorted(plan_organisations)
+                    ],
+                )
             db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error loading plans: {e}")
+            return 0
+
+    print(
+        f"Plans: {inserted} inserted, {len(plans) - inserted} updated, "
+        f"{len(plan_organisations)} organisation links"
+    )
+    return len(plans)
+
+
+@data_cli.command("load-boundaries")
+@click.option("--workers", type=int, default=8, help="Number of concurrent fetches")
+@click.option(
+    "--from-file",
+    "from_file",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="Load from a local-authority-district dataset file (GeoJSON or CSV with WKT) instead",
+)
+@click.option("--batch-size", type=int, default=100, help="Rows per batched update")
+def load_boundaries(workers, from_file, batch_size):
+    if from_file is not None:
+        return load_boundaries_from_file(from_file, batch_size)
+
+    orgs = db.session.execute(
+        select(Organisation.organisation, Organisation.statistical_geography)
+    ).all()
+    base_url = current_app.config["PLANNING_DATA_URL"]
+    with phase("fetch") as fetch, make_session(pool_size=workers) as session:
+        geographies = fetch_geographies(orgs, session, base_url, workers=workers)
+        fetch.rows = len(geographies)
+
+    with phase("write") as write:
+        rows = []
+        for org in orgs:
+            g = geographies.get(org.organisation)
+            if g is None:
+                verbose("No boundary found for", org.organisation)
+                continue
+            verbose("Loading boundary for", org.organisation)
+            rows.append(
+                {
+                    "organisation": org.organisation,
+                    "point": g["point"],
+                    **Organisation.geometry_values(g["geometry"], g["geojson"]),
+                }
+            )
+        if rows:
+            db.session.execute(update(Organisation), rows)
+        db.session.commit()
+        write.rows = len(rows)
+    print(f"Loaded {len(rows)} boundaries for {len(orgs)} organisations")
+    return len(rows)
+
+
+def load_boundaries_from_file(path, batch_size=100):
+    orgs_by_geography = defaultdict(list)
+    for organisation, statistical_geography in db.session.execute(
+        select(Organisation.organisation, Organisation.statistical_geography).where(
+            Organisation.statistical_geography.isnot(None)
+        )
+    ):
+        orgs_by_geography[statistical_geography].append(organisation)
+
+    loaded = unmatched = 0
+    batch = []
+    for geography in iter_geography_file(path):
+        organisations = orgs_by_geography.get(geography["reference"])
+        if not organisations:
+            unmatched += 1
+            continue
+        values = Organisation.geometry_values(
+            geography["geometry"], geography["geojson"]
+        )
+        for organisation in organisations:
+            verbose("Loading boundary for", organisation)
+            batch.append(
+                {"organisation": organisation, "point": geography["point"], **values}
+            )
+        if len(batch) >= batch_size:
+            db.session.execute(update(Organisation), batch)
+            loaded += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(update(Organisation), batch)
+        loaded += len(batch)
+    db.session.commit()
+    print(
+        f"Loaded {loaded} boundaries from {path}, {unmatched} geographies had no matching organisation"
+    )
+    return loaded
+
+
+def iter_geography_file(path):
+    """
+    Stream geographies from a dataset file as dicts of reference, geometry
+    (WKT), geojson and point, reading CSV with a WKT geometry column or a
+    GeoJSON FeatureCollection one feature at a time. geojson is a single
+    feature FeatureCollection, the same shape as the /entity/N.geojson
+    responses the API path stores.
+    """
+    with open(path, mode="r") as file:
+        if path.lower().endswith(".csv"):
+            # WKT for large authorities is bigger than the default field limit
+            csv.field_size_limit(2**31 - 1)
+            for row in csv.DictReader(file):
+                if not row.get("geometry"):
+                    continue
+                geometry = from_wkt(row["geometry"])
+                yield {
+                    "reference": row["reference"],
+                    "geometry": row["geometry"],
+                    "geojson": _feature_collection(
+                        {
+                            "type": "Feature",
+                            "geometry": mapping(geometry),
+                            "properties": {"reference": row["reference"]},
+                        }
+                    ),
+                    "point": row.get("point") or None,
+                }
         else:
-            print("No boundary found for", org.organisation)
+            for feature in iter_geojson_features(file):
+                properties = feature.get("properties") or {}
+                if not feature.get("geometry") or not properties.get("reference"):
+                    continue
+                yield {
+                    "reference": properties["reference"],
+                    "geometry": shape(feature["geometry"]).wkt,
+                    "geojson": _feature_collection(feature),
+                    "point": properties.get("point"),
+                }
+
+
+def _feature_collection(feature):
+    return {"type": "FeatureCollection", "features": [feature]}
+
+
+def iter_geojson_features(file, chunk_size=1 << 16):
+    """
+    Yield the features of a GeoJSON FeatureCollection without loading the
+    whole file, decoding one feature object at a time from a read buffer.
+    While a feature is incomplete each read is as big as the buffer, so a
+    feature many chunks long is decoded a handful of times, not once a chunk.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    while True:
+        index = buffer.find('"features"')
+        bracket = buffer.find("[", index) if index != -1 else -1
+        if bracket != -1:
+            buffer = buffer[bracket + 1 :]
+            break
+        chunk = file.read(chunk_size)
+        if not chunk:
+            return
+        buffer += chunk
+
+    while True:
+        buffer = buffer.lstrip(" \t\r\n,")
+        if buffer.startswith("]"):
+            return
+        try:
+            feature, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            chunk = file.read(max(chunk_size, len(buffer)))
+            if not chunk:
+                if buffer:
+                    raise
+                return
+            buffer += chunk
+            continue
+        yield feature
+        buffer = buffer[end:]
+
+
+def fetch_geographies(orgs, session, base_url, workers=8):
+    """
+    Fetch geographies for (organisation, statistical_geography) pairs
+    concurrently, returning a dict of organisation to geography
+    """
+    geographies = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(
+                _get_geography,
+                f"statistical-geography:{statistical_geography}",
+                session,
+                base_url,
+            ): organisation
+            for organisation, statistical_geography in orgs
+            if statistical_geography
+        }
+        for future in as_completed(futures):
+            geography = future.result()
+            if geography is not None:
+                geographies[futures[future]] = geography
+    return geographies
 
 
-def _get_geography(reference):
-    url = "https://www.planning.data.gov.uk/entity.json"
+def _get_geography(reference, session, base_url):
+    url = f"{base_url}/entity.json"
     params = {"curie": reference}
     try:
-        resp = requests.get(url, params=params)
-        resp.raise_for_status
+        resp = session.get(url, params=params)
+        resp.raise_for_status()
         data = resp.json()
         if len(data["entities"]) == 0:
             print("No entities found for url", resp.url)
             return None
         point = data["entities"][0].get("point")
         entity = data["entities"][0].get("entity")
-        geojson_url = f"https://www.planning.data.gov.uk/entity/{entity}.geojson"
+        geojson_url = f"{base_url}/entity/{entity}.geojson"
         try:
-            resp = requests.get(geojson_url)
+            resp = session.get(geojson_url)
             resp.raise_for_status()
             geography = {
                 "geojson": resp.json(),
@@ -167,56 +499,146 @@ def _get_geography(reference):
         return None
 
 
+DOCUMENT_COPY_COLUMNS = [
+    "reference",
+    "local_plan",
+    "name",
+    "document_url",
+    "documentation_url",
+    "document_types",
+    "start_date",
+    "end_date",
+    "description",
+    "status",
+]
+
+
 @data_cli.command("create-import-docs")
-def create_importable_docs():
+@click.option(
+    "--copy",
+    "copy",
+    is_flag=True,
+    default=False,
+    help="COPY the documents straight into local_plan_document instead of writing the copyable CSV",
+)
+def create_importable_docs(copy):
     current_file_path = Path(__file__).resolve()
     data_directory = os.path.join(current_file_path.parent.parent, "data")
     file_path = os.path.join(data_directory, "local-plan-document.csv")
     out_file_path = os.path.join(data_directory, "local-plan-document-copyable.csv")
-    with open(file_path, mode="r") as file:
-        reader = csv.DictReader(file)
-        with open(out_file_path, mode="w") as out_file:
-            fieldnames = list(reader.fieldnames) + [
-                "start-date",
-                "end-date",
-                "description",
-                "status",
-            ]
-            fieldnames = [field.replace("-", "_") for field in fieldnames]
-            writer = csv.DictWriter(out_file, fieldnames=fieldnames)
-            writer.writeheader()
-            for row in reader:
-                fixed_row = {}
-                try:
-                    plan = LocalPlan.query.get(row["local-plan"])
-                    if plan is None:
-                        print(
-                            "Skipping document",
-                            row["reference"],
-                            "as local plan not found",
-                        )
-                        continue
-
-                    fixed_row["name"] = row["name"]
-                    fixed_row["reference"] = row["reference"]
-                    fixed_row["local_plan"] = row["local-plan"]
-                    fixed_row["document_types"] = (
-                        "{" + row["document-types"].replace("-", "_").upper() + "}"
-                    )
-                    fixed_row["document_url"] = row["document-url"]
-                    fixed_row["documentation_url"] = row["documentation-url"]
-                    fixed_row["start_date"] = ""
-                    fixed_row["description"] = ""
-                    fixed_row["status"] = "FOR_REVIEW"
-                    writer.writerow(fixed_row)
-                except Exception as e:
-                    print(f"Error processing row {row['reference']}: {e}")
+
+    plans = set(db.session.scalars(select(LocalPlan.reference)))
+    documents = importable_documents(read_csv_rows(file_path), plans)
+
+    if copy:
+        inserted, total = copy_documents(documents)
+        print(f"Loaded {inserted} documents, {total - inserted} already existed")
+        return
+
+    with open(out_file_path, mode="w") as out_file:
+        writer = csv.DictWriter(out_file, fieldnames=DOCUMENT_COPY_COLUMNS)
+        writer.writeheader()
+        writer.writerows(documents)
     print("Copyable file created")
 
 
+def read_csv_rows(path):
+    with open(path, mode="r") as file:
+        yield from csv.DictReader(file)
+
+
+def importable_documents(rows, plans):
+    """Convert local-plan-document.csv rows to local_plan_document columns"""
+    for row in rows:
+        try:
+            if row["local-plan"] not in plans:
+                verbose(
+                    "Skipping document", row["reference"], "as local plan not found"
+                )
+                continue
+            yield {
+                "name": row["name"],
+                "reference": row["reference"],
+                "local_plan": row["local-plan"],
+                "document_types": "{"
+                + row["document-types"].replace("-", "_").upper()
+                + "}",
+                "document_url": row["document-url"],
+                "documentation_url": row["documentation-url"],
+                "start_date": "",
+                "description": "",
+                "status": "FOR_REVIEW",
+            }
+        except Exception as e:
+            print(f"Error processing row {row.get('reference')}: {e}")
+
+
+class CSVStream:
+    """Read only file object that encodes rows as CSV on demand, for COPY FROM STDIN"""
+
+    def __init__(self, rows, fieldnames):
+        self.rows = iter(rows)
+        self.buffer = io.StringIO()
+        self.writer = csv.DictWriter(
+            self.buffer, fieldnames=fieldnames, extrasaction="ignore"
+        )
+        self.pending = ""
+        self.count = 0
+
+    def read(self, size=-1):
+        while size < 0 or len(self.pending) < size:
+            row = next(self.rows, None)
+            if row is None:
+                break
+            self.writer.writerow(row)
+            self.count += 1
+            self.pending += self.buffer.getvalue()
+            self.buffer.seek(0)
+            self.buffer.truncate()
+        if size < 0:
+            size = len(self.pending)
+        data, self.pending = self.pending[:size], self.pending[size:]
+        return data
+
+
+def copy_documents(documents):
+    """
+    COPY documents into a staging table and insert the ones whose reference
+    is not already taken, returning the number inserted and the number read
+    """
+    columns = ", ".join(DOCUMENT_COPY_COLUMNS + ["entry_date"])
+    today = datetime.today().date().isoformat()
+    stream = CSVStream(
+        ({**document, "entry_date": today} for document in documents),
+        DOCUMENT_COPY_COLUMNS + ["entry_date"],
+    )
+    try:
+        cursor = db.session.connection().connection.cursor()
+        cursor.execute(
+            "CREATE TEMPORARY TABLE import_local_plan_document "
+            "(LIKE local_plan_document) ON COMMIT DROP"
+        )
+        cursor.copy_expert(
+            f"COPY import_local_plan_document ({columns}) FROM STDIN WITH (FORMAT csv)",
+            stream,
+        )
+        cursor.execute(
+            f"INSERT INTO local_plan_document ({columns}) "
+            f"SELECT {columns} FROM import_local_plan_document "
+            "ON CONFLICT DO NOTHING"
+        )
+        inserted = cursor.rowcount
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return inserted, stream.count
+
+
 @data_cli.command("set-orgs")
 def set_orgs():
-    subquery = (
+    # documents without organisations take those of their plan
+    has_organisations = (
         select(document_organisation.c.local_plan_document_reference)
         .where(
             document_organisation.c.local_plan_document_reference
@@ -224,135 +646,371 @@ def set_orgs():
         )
         .exists()
     )
-    query = select(LocalPlanDocument).where(not_(subquery))
-    result = db.session.execute(query).scalars().all()
-
-    for doc in result:
-        doc.organisations = doc.plan.organisations
-        db.session.add(doc)
-        db.session.commit()
+    documents_without_organisations = (
+        select(LocalPlanDocument.reference, local_plan_organisation.c.organisation)
+        .join(
+            local_plan_organisation,
+            local_plan_organisation.c.local_plan == LocalPlanDocument.local_plan,
+        )
+        .where(not_(has_organisations))
+    )
+    result = db.session.execute(
+        insert(document_organisation).from_select(
+            ["local_plan_document_reference", "organisation"],
+            documents_without_organisations,
+        )
+    )
+    db.session.commit()
+    print(f"Added {result.rowcount} document organisations")
 
 
 @data_cli.command("default-boundaries")
 def set_default_boundaries():
-    from application.models import Organisation
-
-    orgs = Organisation.query.filter(Organisation.geometry.isnot(None)).all()
-    for org in orgs:
-        reference = org.statistical_geography
-        boundary = LocalPlanBoundary.query.get(reference)
-        if boundary is None:
-            boundary = LocalPlanBoundary(
-                reference=reference,
-                name=org.name,
-                description="Default local plan boundary",
-                geometry=org.geometry,
-                geojson=org.geojson,
-            )
-            boundary.organisations.append(org)
+    organisation = Organisation.__table__
+    boundary = LocalPlanBoundary.__table__
+
+    # one organisation per statistical geography, the boundary is created from
+    # its geometry without reading the geometry columns into python
+    defaults = (
+        select(
+            organisation.c.statistical_geography.label("reference"),
+            organisation.c.organisation,
+            organisation.c.name,
+            organisation.c.geometry,
+            organisation.c.geojson,
+            organisation.c.geometry_wkb,
+        )
+        .where(Organisation.has_geometry)
+        .where(organisation.c.statistical_geography.isnot(None))
+        .where(organisation.c.statistical_geography != "")
+        .distinct(organisation.c.statistical_geography)
+        .order_by(organisation.c.statistical_geography, organisation.c.organisation)
+        .cte("defaults")
+    )
 
-        for plan in org.local_plans:
-            if plan.local_plan_boundary is None:
-                plan.local_plan_boundary = boundary.reference
-                plan.boundary_status = Status.FOR_REVIEW
-                boundary.local_plans.append(plan)
-                print("Boundary set for plan", plan.reference)
+    created = db.session.scalars(
+        pg_insert(boundary)
+        .from_select(
+            [
+                "reference",
+                "name",
+                "description",
+                "geometry",
+                "geojson",
+                "geometry_wkb",
+                "entry_date",
+            ],
+            select(
+                defaults.c.reference,
+                defaults.c.name,
+                literal("Default local plan boundary"),
+                defaults.c.geometry,
+                defaults.c.geojson,
+                defaults.c.geometry_wkb,
+                func.current_date(),
+            ),
+        )
+        .on_conflict_do_nothing(index_elements=[boundary.c.reference])
+        .returning(boundary.c.reference)
+    ).all()
 
-        db.session.add(boundary)
-        db.session.commit()
+    if created:
+        db.session.execute(
+            insert(boundary_organisation).from_select(
+                ["local_plan_boundary", "organisation"],
+                select(defaults.c.reference, defaults.c.organisation).where(
+                    defaults.c.reference.in_(created)
+                ),
+            )
+        )
+
+    # plans without a boundary take the default of their first organisation
+    plan_defaults = (
+        select(
+            local_plan_organisation.c.local_plan,
+            boundary.c.reference.label("boundary"),
+        )
+        .join(
+            organisation,
+            organisation.c.organisation == local_plan_organisation.c.organisation,
+        )
+        .join(boundary, boundary.c.reference == organisation.c.statistical_geography)
+        .where(Organisation.has_geometry)
+        .distinct(local_plan_organisation.c.local_plan)
+        .order_by(
+            local_plan_organisation.c.local_plan,
+            local_plan_organisation.c.organisation,
+        )
+        .subquery("plan_defaults")
+    )
+    plan = LocalPlan.__table__
+    updated = db.session.scalars(
+        update(plan)
+        .where(plan.c.reference == plan_defaults.c.local_plan)
+        .where(plan.c.local_plan_boundary.is_(None))
+        .values(
+            local_plan_boundary=plan_defaults.c.boundary,
+            boundary_status=Status.FOR_REVIEW,
+        )
+        .returning(plan.c.reference)
+    ).all()
+    db.session.commit()
 
-    print("Default boundaries set")
+    for reference in updated:
+        verbose("Boundary set for plan", reference)
+    print(
+        f"Default boundaries set: {len(created)} boundaries created, "
+        f"{len(updated)} plans updated"
+    )
+    return len(created) + len(updated)
 
 
 @data_cli.command("doc-types")
-def load_doc_types():
-    document_types_url = (
-        "https://dluhc-datasets.planning-data.dev/dataset/local-plan-document-type.json"
+@REFRESH_OPTION
+def load_doc_types(refresh):
+    return load_reference_types(
+        LocalPlanDocumentType,
+        "https://dluhc-datasets.planning-data.dev/dataset/local-plan-document-type.json",
+        "Document types",
+        refresh,
     )
-    try:
-        resp = requests.get(document_types_url)
-        resp.raise_for_status()
-        data = resp.json()
-        for doc_type in data["records"]:
-            name = doc_type["name"]
-            reference = doc_type["reference"]
-            entry_date = doc_type["entry-date"]
-            end_date = doc_type.get("end-date") if doc_type.get("end-date") else None
-            sql = text(
-                """
-                    INSERT INTO local_plan_document_type (name, reference, entry_date, end_date)
-                    VALUES (:name, :reference, :entry_date, :end_date)
-                    ON CONFLICT (reference)
-                    DO UPDATE
-                    SET end_date = EXCLUDED.end_date;
-                """
-            )
-            db.session.execute(
-                sql,
-                {
-                    "name": name,
-                    "reference": reference,
-                    "entry_date": entry_date,
-                    "end_date": end_date,
-                },
-            )
-        db.session.commit()
-    except requests.exceptions.HTTPError as e:
-        print("Error fetching document types:", e)
 
 
 @data_cli.command("event-types")
-def load_event_types():
-    event_types_url = (
-        "https://dluhc-datasets.planning-data.dev/dataset/local-plan-event.json"
+@REFRESH_OPTION
+def load_event_types(refresh):
+    return load_reference_types(
+        LocalPlanEventType,
+        "https://dluhc-datasets.planning-data.dev/dataset/local-plan-event.json",
+        "Event types",
+        refresh,
     )
-    try:
-        resp = requests.get(event_types_url)
-        resp.raise_for_status()
-        data = resp.json()
-        for event_type in data["records"]:
-            name = event_type["name"]
-            reference = event_type["reference"]
-            entry_date = event_type["entry-date"]
-            end_date = (
-                event_type.get("end-date") if event_type.get("end-date") else None
-            )
 
-            sql = text(
-                """
-                    INSERT INTO local_plan_event_type (name, reference, entry_date, end_date)
-                    VALUES (:name, :reference, :entry_date, :end_date)
-                    ON CONFLICT (reference)
-                    DO UPDATE
-                    SET end_date = EXCLUDED.end_date;
-                """
-            )
-            db.session.execute(
-                sql,
-                {
-                    "name": name,
-                    "reference": reference,
-                    "entry_date": entry_date,
-                    "end_date": end_date,
-                },
+
+def _reference_data_unchanged(dataset, digest, label):
+    """
+    Whether the payload with this sha256 is the one last loaded into the
+    database for dataset, so loading it again would change nothing
+    """
+    loaded = db.session.get(ReferenceDataLoad, dataset)
+    if loaded is None or loaded.sha256 != digest:
+        return False
+    print(f"{label} unchanged since {loaded.loaded_at:%Y-%m-%d %H:%M}, nothing to load")
+    return True
+
+
+def _record_reference_data_load(dataset, digest):
+    """
+    Record the sha256 of the payload just loaded for dataset. Call this in the
+    same transaction as the write so a failed load is retried next time.
+    """
+    now = datetime.now()
+    db.session.execute(
+        pg_insert(ReferenceDataLoad)
+        .values(dataset=dataset, sha256=digest, loaded_at=now)
+        .on_conflict_do_update(
+            index_elements=[ReferenceDataLoad.dataset],
+            set_={"sha256": digest, "loaded_at": now},
+        )
+    )
+
+
+def load_reference_types(model, url, label, refresh=False):
+    """
+    Upsert a dluhc-datasets type list into model's table. The sha256 of the
+    payload is kept in reference_data_load so an unchanged payload is skipped
+    without touching the table, which keeps the release phase fast.
+    """
+    dataset = model.__tablename__
+    try:
+        with phase("fetch") as fetch, make_session() as session:
+            resp = _http_cache().get(session, url)
+            records = resp.json()["records"]
+            fetch.rows = len(records)
+    except requests.exceptions.RequestException as e:
+        print(f"Error fetching {label.lower()}:", e)
+        return 0
+
+    if not refresh and _reference_data_unchanged(dataset, resp.sha256, label):
+        return 0
+
+    with phase("write") as write:
+        rows = [
+            {
+                "name": record["name"],
+                "reference": record["reference"],
+                "entry_date": record["entry-date"],
+                "end_date": record.get("end-date") or None,
+            }
+            for record in records
+        ]
+        if rows:
+            table = model.__table__
+            stmt = pg_insert(table)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.reference],
+                set_={"end_date": stmt.excluded.end_date},
             )
+            db.session.execute(stmt, rows)
+        _record_reference_data_load(dataset, resp.sha256)
         db.session.commit()
-    except requests.exceptions.HTTPError as e:
-        print("Error fetching event types:", e)
+        write.rows = len(rows)
+    print(f"Loaded {len(rows)} {label.lower()}")
+    return len(rows)
+
+
+# each step with the steps it must wait for, steps whose dependencies are met
+# run at the same time
+LOAD_ALL_STEPS = {
+    "load-orgs": [],
+    "doc-types": [],
+    "event-types": [],
+    "load-plans": ["load-orgs"],
+    "load-boundaries": ["load-orgs"],
+    "default-boundaries": ["load-plans", "load-boundaries"],
+}
+
+
+SNAPSHOT_LOAD_STEPS = {
+    "load-snapshot": [],
+    "load-plans": ["load-snapshot"],
+    "default-boundaries": ["load-plans"],
+}
 
 
 @data_cli.command("load-all")
+@click.option(
+    "--from-snapshot",
+    "from_snapshot",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="Load reference data from a snapshot made by snapshot-reference instead of upstream services",
+)
 @click.pass_context
-def load_all(ctx):
-    ctx.invoke(load_orgs)
-    ctx.invoke(load_plans)
-    ctx.invoke(load_boundaries)
-    ctx.invoke(set_default_boundaries)
-    ctx.invoke(load_doc_types)
-    ctx.invoke(load_event_types)
+def load_all(ctx, from_snapshot):
+    commands = {
+        "load-orgs": load_orgs,
+        "doc-types": load_doc_types,
+        "event-types": load_event_types,
+        "load-plans": load_plans,
+        "load-boundaries": load_boundaries,
+        "default-boundaries": set_default_boundaries,
+    }
+    steps = LOAD_ALL_STEPS
+    if from_snapshot is not None:
+        commands["load-snapshot"] = partial(load_reference_snapshot, from_snapshot)
+        steps = SNAPSHOT_LOAD_STEPS
+
+    results = run_steps(ctx, commands, steps)
+    print_step_summary(results)
+    incomplete = [
+        name for name, result in results.items() if result["status"] != "done"
+    ]
+    if incomplete:
+        raise click.ClickException(f"Data load incomplete: {', '.join(incomplete)}")
     print("Data load complete")
 
 
+def load_reference_snapshot(path):
+    try:
+        loaded = load_snapshot(db.session.connection(), path)
+        # the tables no longer hold what was last loaded from upstream
+        db.session.execute(delete(ReferenceDataLoad))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    for table, rows in loaded.items():
+        print(f"Loaded {rows} {table} rows from {path}")
+    return sum(loaded.values())
+
+
+@data_cli.command("snapshot-reference")
+@click.option(
+    "--output",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Where to write the snapshot, defaults to data/snapshots/reference-<date>.tar.gz",
+)
+def snapshot_reference(output):
+    """Save organisations, geographies, document types and event types to a local snapshot"""
+    if output is None:
+        directory = Path(__file__).resolve().parent.parent / "data" / "snapshots"
+        directory.mkdir(parents=True, exist_ok=True)
+        output = directory / f"reference-{datetime.now().strftime('%Y-%m-%d')}.tar.gz"
+    manifest = write_snapshot(db.session.connection(), output)
+    db.session.rollback()
+    for table, details in manifest["tables"].items():
+        print(f"{table}: {details['rows']} rows")
+    print(f"Snapshot written to {output} ({os.path.getsize(output)} bytes)")
+
+
+def run_steps(ctx, commands, dependencies):
+    """
+    Invoke the commands as a dependency graph, each in its own thread and app
+    context so it gets its own database session. A failed step skips every
+    step that depends on it.
+
+    Returns a dict of step name to status, seconds and the row count the
+    command returned.
+    """
+    app = current_app._get_current_object()
+    metrics = current_metrics()
+    options = {"verbose": metrics is not None and metrics.verbose}
+
+    def run(name):
+        command = commands[name]
+        started = time.perf_counter()
+        try:
+            with app.app_context():
+                if isinstance(command, click.Command):
+                    rows = ctx.invoke(command, **options)
+                else:
+                    rows = ctx.invoke(command)
+        except Exception as e:
+            print(f"Step {name} failed: {e}")
+            return "failed", time.perf_counter() - started, None
+        return "done", time.perf_counter() - started, rows
+
+    results = {}
+    pending = dict(dependencies)
+    running = {}
+    with ThreadPoolExecutor(max_workers=len(dependencies)) as executor:
+        while pending or running:
+            for name, needs in list(pending.items()):
+                if any(
+                    results.get(need, {}).get("status") in ("failed", "skipped")
+                    for need in needs
+                ):
+                    results[name] = {"status": "skipped", "seconds": 0, "rows": None}
+                    del pending[name]
+                elif all(need in results for need in needs):
+                    running[executor.submit(run, name)] = name
+                    del pending[name]
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                status, seconds, rows = future.result()
+                results[running.pop(future)] = {
+                    "status": status,
+                    "seconds": seconds,
+                    "rows": rows,
+                }
+    return {name: results[name] for name in dependencies}
+
+
+def print_step_summary(results):
+    width = max(len(name) for name in results)
+    print(f"\n{'step'.ljust(width)}  {'status':>7}  {'seconds':>8}  {'rows':>8}")
+    for name, result in results.items():
+        rows = "" if result["rows"] is None else result["rows"]
+        print(
+            f"{name.ljust(width)}  {result['status']:>7}  "
+            f"{result['seconds']:>8.2f}  {rows:>8}"
+        )
+
+
 @data_cli.command("load-db-backup")
 def load_db_backup():
     import subprocess
@@ -434,33 +1092,46 @@ def load_db_backup():
 
 
 @data_cli.command("set-org-websites")
-def set_org_websites():
-    base_url = "https://datasette.planning.data.gov.uk/digital-land/organisation.json"
-    orgs = Organisation.query.all()
-    for org in orgs:
-        params = {
-            "website__notblank": 1,
-            "organisation__exact": org.organisation,
-            "_shape": "array",
-        }
-
-        try:
-            resp = requests.get(base_url, params=params)
-            resp.raise_for_status()
-            data = resp.json()
-            print(f"Fetching data for {org.organisation}")
-            if len(data) > 0:
-                website = data[0].get("website")
-                if website:
-                    org.website = website
-                    db.session.add(org)
-                    db.session.commit()
-                    print(f"Set website {website} for {org.organisation}")
-            else:
-                print(f"No website found for {org.organisation}")
-        except Exception as e:
-            print(f"Error fetching data for {org.organisation}: {e}")
-            continue
+@REFRESH_OPTION
+def set_org_websites(refresh):
+    url = f"{current_app.config['DATASETTE_URL']}/digital-land/organisation.json"
+    params = {"website__notblank": 1, "_shape": "array"}
+    try:
+        with make_session() as session:
+            data, digest = _http_cache().get_json_pages(session, url, params=params)
+    except Exception as e:
+        print(f"Error fetching organisation websites: {e}")
+        return
+    if not refresh and _reference_data_unchanged(
+        "organisation-website", digest, "Organisation websites"
+    ):
+        return
+
+    websites = {
+        org["organisation"]: org["website"]
+        for org in data
+        if org.get("organisation") and org.get("website")
+    }
+    if not websites:
+        print("No organisation websites found")
+        return
+
+    table = Organisation.__table__
+    website_values = values(
+        column("organisation", Text), column("website", Text), name="websites"
+    ).data(sorted(websites.items()))
+    result = db.session.execute(
+        update(table)
+        .where(table.c.organisation == website_values.c.organisation)
+        .where(table.c.website.is_distinct_from(website_values.c.website))
+        .values(website=website_values.c.website)
+    )
+    _record_reference_data_load("organisation-website", digest)
+    db.session.commit()
+    print(
+        f"Fetched {len(websites)} organisation websites, "
+        f"updated {result.rowcount} organisations"
+    )
 
 
 def _make_reference(name, period_start_date, period_end_date, organisation):
@@ -483,29 +1154,56 @@ def _make_reference(name, period_start_date, period_end_date, organisation):
     return reference
 
 
+DOCUMENT_TYPE_RENAMES = {"financial-viability-study": "viability-assessment"}
+
+
 @data_cli.command("migrate-doc-types")
-def migrate_doc_types():
-    documents = LocalPlanDocument.query.filter(
-        LocalPlanDocument.document_types.isnot(None)
-    ).all()
-    for document in documents:
+@click.option("--batch-size", default=1000, show_default=True)
+def migrate_doc_types(batch_size):
+    document_types = set(db.session.scalars(select(LocalPlanDocumentType.reference)))
+    documents = db.session.execute(
+        select(
+            LocalPlanDocument.reference,
+            LocalPlanDocument.local_plan,
+            LocalPlanDocument.document_types,
+        ).where(LocalPlanDocument.document_types.isnot(None))
+    )
+
+    updates = []
+    unknown = Counter()
+    for reference, local_plan, current_types in documents:
         updated_document_types = []
-        for doc_type in document.document_types:
+        for doc_type in current_types:
             ref = doc_type.lower().replace("_", "-")
-            if ref == "financial-viability-study":
-                ref = "viability-assessment"
-            document_type = LocalPlanDocumentType.query.get(ref)
-            if document_type is None:
-                print(
-                    f"No matching document type found for {ref} for document {document.reference}"
-                )
+            ref = DOCUMENT_TYPE_RENAMES.get(ref, ref)
+            if ref in document_types:
+                updated_document_types.append(ref)
             else:
-                updated_document_types.append(document_type.reference)
-        if updated_document_types:
-            document.document_types = updated_document_types
-            db.session.add(document)
-            db.session.commit()
-            print(f"Updated document types for {document.reference}")
+                unknown[ref] += 1
+        if updated_document_types and updated_document_types != current_types:
+            updates.append((reference, local_plan, updated_document_types))
+
+    table = LocalPlanDocument.__table__
+    for start in range(0, len(updates), batch_size):
+        batch = values(
+            column("reference", Text),
+            column("local_plan", Text),
+            column("document_types", ARRAY(Text)),
+            name="updates",
+        ).data(updates[start : start + batch_size])
+        db.session.execute(
+            update(table)
+            .where(table.c.reference == batch.c.reference)
+            .where(table.c.local_plan == batch.c.local_plan)
+            .values(document_types=batch.c.document_types)
+        )
+    db.session.commit()
+
+    print(f"Updated document types for {len(updates)} documents")
+    if unknown:
+        print("No matching document type found for:")
+        for ref, count in sorted(unknown.items()):
+            print(f"  {ref}: {count} documents")
 
 
 @data_cli.command("docker-db-backup")
@@ -552,159 +1250,802 @@ def load_backup_from_file_in_docker(file):
 @data_cli.command("fix-duplicate-document-references")
 def fix_duplicate_document_references():
     """Find and fix any duplicate document references"""
-    from sqlalchemy import text
-
-    from application.blueprints.document.views import make_document_reference
 
-    # First make the constraint deferrable
-    db.session.execute(
-        text(
-            """
-            ALTER TABLE document_organisation
-            DROP CONSTRAINT document_organisation_local_plan_document_reference_local__fkey,
-            ADD CONSTRAINT document_organisation_local_plan_document_reference_local__fkey
-            FOREIGN KEY (local_plan_document_reference, local_plan_document_local_plan)
-            REFERENCES local_plan_document(reference, local_plan)
-            DEFERRABLE INITIALLY DEFERRED;
-            """
+    # Every document sharing a reference is renamed to <reference>-<local plan>,
+    # with -2, -3... added where that is already taken, so the result only
+    # depends on the data. All of it happens in one transaction.
+    try:
+        db.session.execute(
+            text(
+                """
+                CREATE TEMPORARY TABLE document_reference_fix ON COMMIT DROP AS
+                WITH duplicates AS (
+                    SELECT reference, local_plan,
+                    reference || '-' || local_plan AS candidate
+                    FROM local_plan_document
+                    WHERE reference IN (
+                        SELECT reference
+                        FROM local_plan_document
+                        GROUP BY reference
+                        HAVING COUNT(local_plan) > 1
+                    )
+                ),
+                numbered AS (
+                    SELECT reference, local_plan, candidate,
+                    row_number() OVER (
+                        PARTITION BY candidate ORDER BY reference, local_plan
+                    ) AS n,
+                    EXISTS (
+                        SELECT 1 FROM local_plan_document d
+                        WHERE d.reference = candidate
+                    ) AS taken
+                    FROM duplicates
+                )
+                SELECT reference, local_plan,
+                CASE WHEN n = 1 AND NOT taken THEN candidate
+                ELSE candidate || '-' || (n + 1)::text
+                END AS new_reference
+                FROM numbered
+                """
+            )
         )
-    )
-    db.session.commit()
+        collisions = db.session.execute(
+            text(
+                """
+                SELECT new_reference FROM document_reference_fix f
+                WHERE EXISTS (
+                    SELECT 1 FROM local_plan_document d
+                    WHERE d.reference = f.new_reference
+                )
+                OR new_reference IN (
+                    SELECT new_reference FROM document_reference_fix
+                    GROUP BY new_reference HAVING COUNT(*) > 1
+                )
+                """
+            )
+        ).fetchall()
+        if collisions:
+            db.session.rollback()
+            print(
+                "New references clash with existing documents, nothing changed:",
+                ", ".join(row.new_reference for row in collisions),
+            )
+            return
 
-    # First find all duplicate references
-    duplicate_refs = db.session.execute(
-        text(
-            """
-            SELECT reference
-            FROM local_plan_document
-            GROUP BY reference
-            HAVING COUNT(local_plan) > 1
-            """
+        fixes = db.session.execute(
+            text(
+                """
+                SELECT reference, local_plan, new_reference
+                FROM document_reference_fix
+                ORDER BY reference, local_plan
+                """
+            )
+        ).fetchall()
+        print(
+            f"Found {len({fix.reference for fix in fixes})} references that have duplicates"
         )
-    ).fetchall()
 
-    print(f"Found {len(duplicate_refs)} references that have duplicates")
+        if not fixes:
+            db.session.rollback()
+            print("\nNo duplicate references to fix")
+            return 0
 
-    for ref in duplicate_refs:
-        reference = ref[0]
-        # Get all documents with this reference
-        docs = db.session.execute(
+        # the document_organisation foreign key is made deferrable by migration
+        # e7b3c9d2f418, documents and their links are renamed before it's checked
+        db.session.execute(text("SET CONSTRAINTS ALL DEFERRED"))
+        db.session.execute(
             text(
                 """
-                SELECT reference, local_plan, name
-                FROM local_plan_document
-                WHERE reference = :reference
-                ORDER BY local_plan
+                UPDATE local_plan_document d
+                SET reference = f.new_reference
+                FROM document_reference_fix f
+                WHERE d.reference = f.reference
+                AND d.local_plan = f.local_plan
                 """
-            ),
-            {"reference": reference},
-        ).fetchall()
+            )
+        )
+        db.session.execute(
+            text(
+                """
+                UPDATE document_organisation o
+                SET local_plan_document_reference = f.new_reference
+                FROM document_reference_fix f
+                WHERE o.local_plan_document_reference = f.reference
+                AND o.local_plan_document_local_plan = f.local_plan
+                """
+            )
+        )
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error fixing duplicate document references: {str(e)}")
+        return
 
-        print(f"\nFound {len(docs)} documents with reference '{reference}'")
+    for fix in fixes:
+        verbose(
+            f"Updated document reference from '{fix.reference}' to "
+            f"'{fix.new_reference}' for plan {fix.local_plan}"
+        )
+    print("\nAll duplicate references have been fixed")
+    return len(fixes)
+
+
+RANKED_DOCUMENTS_SQL = """
+    WITH keyed AS (
+        SELECT d.reference, d.local_plan, d.document_url, d.end_date,
+        ARRAY(
+            SELECT o.organisation FROM document_organisation o
+            WHERE o.local_plan_document_reference = d.reference
+            ORDER BY o.organisation
+        ) AS organisations
+        FROM local_plan_document d
+    ),
+    ranked AS (
+        SELECT reference, local_plan, document_url, end_date, organisations,
+        row_number() OVER duplicates AS rank,
+        first_value(reference) OVER duplicates AS keeper,
+        count(*) OVER (PARTITION BY local_plan, document_url, organisations) AS copies
+        FROM keyed
+        WINDOW duplicates AS (
+            PARTITION BY local_plan, document_url, organisations
+            ORDER BY length(reference), reference
+        )
+    )
+"""
 
-        for doc in docs:
-            try:
-                old_ref = doc.reference
-                new_ref = make_document_reference(doc.reference, doc.local_plan)
-                print(f"Updating document for plan {doc.local_plan}")
 
-                # Do updates in a single transaction
-                db.session.execute(
-                    text(
-                        """
-                        BEGIN;
-                        UPDATE local_plan_document
-                        SET reference = :new_ref
-                        WHERE reference = :old_ref
-                        AND local_plan = :local_plan;
-
-                        UPDATE document_organisation
-                        SET local_plan_document_reference = :new_ref
-                        WHERE local_plan_document_reference = :old_ref
-                        AND local_plan_document_local_plan = :local_plan;
-
-                        COMMIT;
-                        """
-                    ),
-                    {
-                        "new_ref": new_ref,
-                        "old_ref": old_ref,
-                        "local_plan": doc.local_plan,
-                    },
+@data_cli.command("dedupe-documents")
+@click.option(
+    "--dry-run",
+    is_flag=True,
+    default=False,
+    help="Report the duplicates that would be end dated without changing anything",
+)
+def dedupe_documents(dry_run):
+    """Remove duplicate LocalPlanDocuments that share the same local plan, organisations and document URL"""
+    print("Finding duplicate documents...")
+
+    # documents are ranked by shortest reference within each group of
+    # duplicates, every document but the first is end dated
+    if dry_run:
+        duplicates = db.session.execute(
+            text(
+                RANKED_DOCUMENTS_SQL
+                + """
+                SELECT reference, document_url, keeper, copies, end_date
+                FROM ranked WHERE rank > 1
+                ORDER BY local_plan, document_url, organisations, rank
+                """
+            ).execution_options(yield_per=1000)
+        )
+        keeper = None
+        end_date_count = 0
+        for doc in duplicates:
+            if doc.keeper != keeper:
+                keeper = doc.keeper
+                print(
+                    f"\nFound {doc.copies} duplicates for document URL: {doc.document_url}"
                 )
+                print(f"Keeping document with reference: {keeper}")
+            if doc.end_date is None:
+                print(
+                    f"Would set end date for duplicate with reference: {doc.reference}"
+                )
+                end_date_count += 1
+            else:
+                print(f"Duplicate with reference {doc.reference} already end dated")
+        print(f"\nWould set end date for {end_date_count} duplicate documents")
+        return
 
-                print(f"Updated document reference from '{old_ref}' to '{new_ref}'")
+    try:
+        result = db.session.execute(
+            text(
+                RANKED_DOCUMENTS_SQL
+                + """
+                UPDATE local_plan_document d
+                SET end_date = current_date
+                FROM ranked r
+                WHERE r.rank > 1
+                AND d.reference = r.reference
+                AND d.local_plan = r.local_plan
+                AND d.end_date IS NULL
+                """
+            )
+        )
+        db.session.commit()
+        print(f"\nSuccessfully set end date for {result.rowcount} duplicate documents")
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error committing changes: {str(e)}")
 
-            except Exception as e:
-                db.session.execute(text("ROLLBACK;"))
-                print(f"Error updating document {old_ref}: {str(e)}")
-                continue
 
-    # Restore the constraint to its original state
+@data_cli.command("discover-documents")
+@plan_option(
+    "Only crawl these plans (may be repeated), defaults to every plan with a documentation url"
+)
+@workers_option(16, "Number of plans crawled at once")
+@PER_HOST_OPTION
+@DELAY_OPTION
+@click.option(
+    "--max-pages",
+    type=int,
+    default=20,
+    help="Same-site pages followed from each documentation page",
+)
+@timeout_option(20)
+@batch_size_option(500, "Candidates per bulk insert")
+@refresh_option("Ignore the crawl cache and fetch and parse every page in full")
+@BACKGROUND_OPTION
+def discover_documents(
+    plans, workers, per_host, delay, max_pages, timeout, batch_size, refresh, background
+):
+    """
+    Crawl plan documentation pages for documents into document_candidate.
+    Pages fetched before are requested conditionally and their links reused
+    from crawl_cache if they haven't changed.
+    """
+    if background:
+        return _run_in_background("discover-documents")
+
+    query = select(LocalPlan.reference, LocalPlan.documentation_url).where(
+        LocalPlan.documentation_url.isnot(None), LocalPlan.documentation_url != ""
+    )
+    if plans:
+        query = query.where(LocalPlan.reference.in_(plans))
+    to_crawl = db.session.execute(query).all()
+    matcher = DocumentTypeMatcher(
+        dict(
+            db.session.execute(
+                select(LocalPlanDocumentType.reference, LocalPlanDocumentType.name)
+            ).all()
+        )
+    )
+
+    with phase("load cache"):
+        entries = []
+        if not refresh:
+            entries = [
+                dict(row._mapping)
+                for row in db.session.execute(select(CrawlCache.__table__))
+            ]
+        cache = PageCache(entries)
+
+    table = DocumentCandidate.__table__
+    cache_table = CrawlCache.__table__
+    found = errors = 0
+    batch = []
+
+    def write(rows):
+        stmt = pg_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.local_plan, table.c.document_url],
+            set_={
+                "name": stmt.excluded.name,
+                "documentation_url": stmt.excluded.documentation_url,
+                "document_type": stmt.excluded.document_type,
+                "found_date": stmt.excluded.found_date,
+            },
+        )
+        db.session.execute(stmt, rows)
+        db.session.commit()
+
+    def write_cache(entries):
+        stmt = pg_insert(cache_table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[cache_table.c.url],
+            set_={
+                c.name: stmt.excluded[c.name] for c in cache_table.c if c.name != "url"
+            },
+        )
+        db.session.execute(stmt, entries)
+        db.session.commit()
+
+    with phase("crawl") as crawl, _crawler(workers, per_host, delay, timeout) as (
+        session,
+        limiter,
+        executor,
+    ):
+        futures = {
+            executor.submit(
+                crawl_plan,
+                session,
+                limiter,
+                reference,
+                url,
+                matcher,
+                max_pages,
+                cache,
+                current_app.config["DISCOVERY_MAX_PAGE_BYTES"],
+            ): reference
+            for reference, url in to_crawl
+        }
+        for future in as_completed(futures):
+            reference = futures[future]
+            candidates, plan_errors = future.result()
+            for error in plan_errors:
+                verbose(f"Error fetching {error}")
+            verbose(f"Found {len(candidates)} candidate documents for {reference}")
+            found += len(candidates)
+            errors += len(plan_errors)
+            now = datetime.now()
+            batch.extend({**candidate, "found_date": now} for candidate in candidates)
+            if len(batch) >= batch_size:
+                write(batch)
+                batch = []
+            if updates := cache.take_updates(minimum=batch_size):
+                write_cache(updates)
+        if batch:
+            write(batch)
+        if updates := cache.take_updates():
+            write_cache(updates)
+        crawl.rows = found
+
+    print(
+        f"Found {found} candidate documents for {len(to_crawl)} plans, "
+        f"{errors} pages could not be fetched, "
+        f"{cache.reused} unchanged pages reused from the crawl cache"
+    )
+    return found
+
+
+def _run_in_background(command):
+    """Re-run this command in a detached process, logging to data/logs"""
+    log_directory = Path(__file__).resolve().parent.parent / "data" / "logs"
+    log_directory.mkdir(parents=True, exist_ok=True)
+    log_path = log_directory / f"{command}-{datetime.now():%Y%m%d-%H%M%S}.log"
+    args = [arg for arg in sys.argv[1:] if arg != "--background"]
+    with open(log_path, "w") as log:
+        process = subprocess.Popen(
+            [sys.executable, "-m", "flask", *args],
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+    print(f"Started {command} in process {process.pid}, logging to {log_path}")
+
+
+@contextmanager
+def _crawler(workers, per_host, delay, timeout, raise_on_status=True):
+    """
+    A session, per-host limiter and thread pool for fetching from council
+    websites, many of which have broken certificate chains
+    """
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+    limiter = HostLimiter(per_host=per_host, delay=delay)
+    with make_session(
+        pool_size=workers,
+        retries=1,
+        timeout=(5, timeout),
+        raise_on_status=raise_on_status,
+    ) as session, ThreadPoolExecutor(max_workers=workers) as executor:
+        yield session, limiter, executor
+
+
+def _current_documents(plans):
+    """Where clause for current documents, of the given plans if any"""
+    table = LocalPlanDocument.__table__
+    current = table.c.end_date.is_(None)
+    if plans:
+        current = current & table.c.local_plan.in_(plans)
+    return current
+
+
+def _update_documents_by_url(current, url_column, columns, rows):
+    """
+    Set columns of the matching documents from rows of (url, *values) in a
+    single UPDATE ... FROM (VALUES ...), columns maps each column to its type.
+    Values are cast to the column types, as postgres types a VALUES column
+    holding only NULLs as text.
+    """
+    if not rows:
+        return
+    table = LocalPlanDocument.__table__
+    new = values(
+        column("url", Text),
+        *(column(name, type_) for name, type_ in columns.items()),
+        name="new",
+    ).data(rows)
     db.session.execute(
-        text(
-            """
-            ALTER TABLE document_organisation
-            DROP CONSTRAINT document_organisation_local_plan_document_reference_local__fkey,
-            ADD CONSTRAINT document_organisation_local_plan_document_reference_local__fkey
-            FOREIGN KEY (local_plan_document_reference, local_plan_document_local_plan)
-            REFERENCES local_plan_document(reference, local_plan)
-            NOT DEFERRABLE;
-            """
+        update(table)
+        .where(current, table.c[url_column] == new.c.url)
+        .values({name: cast(new.c[name], type_) for name, type_ in columns.items()})
+    )
+
+
+@data_cli.command("check-links")
+@plan_option("Only check documents for these plans (may be repeated)")
+@workers_option(16, "Number of urls checked at once")
+@PER_HOST_OPTION
+@DELAY_OPTION
+@timeout_option(20)
+@batch_size_option(500, "Results per batched update")
+@BACKGROUND_OPTION
+def check_links(plans, workers, per_host, delay, timeout, batch_size, background):
+    """
+    Check the document and documentation urls of current documents and record
+    the results on the documents
+    """
+    if background:
+        return _run_in_background("check-links")
+
+    table = LocalPlanDocument.__table__
+    current = _current_documents(plans)
+    with phase("select"):
+        document_urls = set(
+            db.session.scalars(
+                select(table.c.document_url)
+                .distinct()
+                .where(current, table.c.document_url != "")
+            )
+        )
+        documentation_urls = set(
+            db.session.scalars(
+                select(table.c.documentation_url)
+                .distinct()
+                .where(current, table.c.documentation_url != "")
+            )
         )
+    # a url can be both, it only needs checking once
+    urls = document_urls | documentation_urls
+
+    def write(results):
+        _update_documents_by_url(
+            current,
+            "document_url",
+            {
+                "link_status": Integer,
+                "link_final_url": Text,
+                "link_content_type": Text,
+                "link_content_length": BigInteger,
+                "link_error": Text,
+                "link_checked_date": DateTime,
+            },
+            [
+                (
+                    url,
+                    r["status"],
+                    r["final_url"],
+                    r["content_type"],
+                    r["content_length"],
+                    r["error"],
+                    r["checked_date"],
+                )
+                for url, r in results
+                if url in document_urls
+            ],
+        )
+        _update_documents_by_url(
+            current,
+            "documentation_url",
+            {"documentation_link_status": Integer},
+            [(url, r["status"]) for url, r in results if url in documentation_urls],
+        )
+        db.session.commit()
+
+    def check(url):
+        with limiter.limit(url):
+            return check_link(session, url)
+
+    statuses = Counter()
+    batch = []
+    # record 429 and 5xx statuses rather than failing once retries run out
+    with phase("check") as checking, _crawler(
+        workers, per_host, delay, timeout, raise_on_status=False
+    ) as (session, limiter, executor):
+        futures = {executor.submit(check, url): url for url in urls}
+        for future in as_completed(futures):
+            url = futures[future]
+            result = future.result()
+            statuses[_link_health(result["status"])] += 1
+            if result["status"] is None or result["status"] >= 400:
+                verbose(f"{result['status'] or result['error']}: {url}")
+            batch.append((url, result))
+            if len(batch) >= batch_size:
+                write(batch)
+                batch = []
+        if batch:
+            write(batch)
+        checking.rows = len(urls)
+
+    print(f"Checked {len(urls)} urls:")
+    for health, count in sorted(statuses.items()):
+        print(f"  {health}: {count}")
+    return len(urls)
+
+
+def _link_health(status):
+    if status is None:
+        return "unreachable"
+    return f"{status // 100}xx"
+
+
+@data_cli.command("fingerprint-documents")
+@plan_option("Only fingerprint documents for these plans (may be repeated)")
+@workers_option(8, "Number of files downloaded at once")
+@PER_HOST_OPTION
+@DELAY_OPTION
+@timeout_option(60)
+@batch_size_option(200, "Results per batched update")
+@refresh_option("Fingerprint documents that already have a content hash again")
+@BACKGROUND_OPTION
+def fingerprint_documents(
+    plans, workers, per_host, delay, timeout, batch_size, refresh, background
+):
+    """
+    Download current documents and store a sha256 and size of each file, so
+    the same file published under different urls can be found
+    """
+    if background:
+        return _run_in_background("fingerprint-documents")
+
+    table = LocalPlanDocument.__table__
+    current = _current_documents(plans)
+    query = (
+        select(table.c.document_url)
+        .distinct()
+        .where(current, table.c.document_url != "")
     )
-    db.session.commit()
+    if not refresh:
+        query = query.where(table.c.content_hash.is_(None))
+    with phase("select"):
+        urls = db.session.scalars(query).all()
+
+    def write(results):
+        _update_documents_by_url(
+            current,
+            "document_url",
+            {
+                "content_hash": Text,
+                "content_size": BigInteger,
+                "content_hashed_date": DateTime,
+            },
+            results,
+        )
+        db.session.commit()
 
-    print("\nAll duplicate references have been fixed")
+    def download(url):
+        try:
+            with limiter.limit(url):
+                return url, *fingerprint(session, url), None
+        except Exception as e:
+            return url, None, None, e
+
+    failed = 0
+    batch = []
+    with phase("fingerprint") as fingerprinting, _crawler(
+        workers, per_host, delay, timeout
+    ) as (session, limiter, executor):
+        for url, content_hash, size, error in _bounded_map(
+            executor, download, urls, workers * 2
+        ):
+            if error is not None:
+                failed += 1
+                verbose(f"Error fetching {url}: {error}")
+                continue
+            verbose(f"{content_hash} {size:>12} {url}")
+            batch.append((url, content_hash, size, datetime.now()))
+            if len(batch) >= batch_size:
+                write(batch)
+                batch = []
+        if batch:
+            write(batch)
+        fingerprinting.rows = len(urls) - failed
+
+    shared = db.session.scalar(
+        select(func.count()).select_from(_shared_content_hashes().subquery())
+    )
+    print(
+        f"Fingerprinted {len(urls) - failed} of {len(urls)} document urls, "
+        f"{shared} files are published under more than one url"
+    )
+    return len(urls) - failed
 
 
-@data_cli.command("dedupe-documents")
-def dedupe_documents():
-    """Remove duplicate LocalPlanDocuments that share the same local plan, organisations and document URL"""
-    print("Finding duplicate documents...")
+def _shared_content_hashes():
+    """Content hashes of current documents found at more than one url"""
+    table = LocalPlanDocument.__table__
+    return (
+        select(table.c.content_hash)
+        .where(table.c.end_date.is_(None), table.c.content_hash.isnot(None))
+        .group_by(table.c.content_hash)
+        .having(func.count(table.c.document_url.distinct()) > 1)
+    )
+
 
-    # Get all documents grouped by their identifying characteristics
-    documents = LocalPlanDocument.query.all()
-    duplicates = defaultdict(list)
-
-    for doc in documents:
-        # Create tuple of identifying characteristics
-        key = (
-            doc.local_plan,
-            doc.document_url,
-            # Convert organisations list to frozen set for hashability
-            frozenset(org.organisation for org in doc.organisations),
-        )
-        duplicates[key].append(doc)
-
-    end_date_count = 0
-
-    # Process each group of potential duplicates
-    for key, docs in duplicates.items():
-        if len(docs) > 1:
-            # Sort by reference length to keep shortest
-            docs.sort(key=lambda x: len(x.reference))
-            keeper = docs[0]
-
-            print(f"\nFound {len(docs)} duplicates for document URL: {key[1]}")
-            print(f"Keeping document with reference: {keeper.reference}")
-
-            # Set end date for all but the keeper
-            for doc in docs[1:]:
-                try:
-                    print(
-                        f"Setting end date for duplicate with reference: {doc.reference}"
+@data_cli.command("duplicate-content")
+def duplicate_content():
+    """List current documents whose files have the same content but different urls"""
+    table = LocalPlanDocument.__table__
+    documents = db.session.execute(
+        select(
+            table.c.content_hash,
+            table.c.local_plan,
+            table.c.reference,
+            table.c.document_url,
+        )
+        .where(
+            table.c.end_date.is_(None),
+            table.c.content_hash.in_(_shared_content_hashes()),
+        )
+        .order_by(table.c.content_hash, table.c.local_plan, table.c.reference)
+    )
+    groups = 0
+    last_hash = None
+    for content_hash, local_plan, reference, document_url in documents:
+        if content_hash != last_hash:
+            groups += 1
+            last_hash = content_hash
+            print(f"\n{content_hash}")
+        print(f"  {local_plan} {reference} {document_url}")
+    print(f"\n{groups} files are published under more than one url")
+    return groups
+
+
+@data_cli.command("repair-geometries")
+@click.option(
+    "--fix/--dry-run",
+    default=False,
+    help="Write repaired geometries back to the database (default is report only)",
+)
+@click.option("--workers", type=int, default=None, help="Number of worker processes")
+@click.option("--batch-size", type=int, default=50, help="Rows per batched update")
+def repair_geometries(fix, workers, batch_size):
+    """Check validity of all boundary and organisation geometries and repair them with make_valid"""
+    from application.geometry import repair_geometry
+
+    targets = [
+        (LocalPlanBoundary, LocalPlanBoundary.reference, "reference"),
+        (Organisation, Organisation.organisation, "organisation"),
+    ]
+    workers = workers or os.cpu_count() or 1
+    # spawn rather than fork so workers don't inherit open database connections
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        for model, key_column, key in targets:
+            query = (
+                select(key_column, model.geometry, model.geojson, model.geometry_wkb)
+                .where(
+                    or_(
+                        model.geometry.isnot(None),
+                        model.geojson.isnot(None),
+                        model.geometry_wkb.isnot(None),
                     )
-                    doc.end_date = datetime.now().date()
-                    end_date_count += 1
-                except Exception as e:
-                    print(f"Error updating document {doc.reference}: {str(e)}")
-                    db.session.rollback()
+                )
+                .execution_options(yield_per=batch_size)
+            )
+            rows = (tuple(row) for row in db.session.execute(query))
+            checked = invalid = failed = 0
+            fixes = []
+            for record_key, problems, wkt, geojson in _bounded_map(
+                executor, repair_geometry, rows, workers * 4
+            ):
+                checked += 1
+                if not problems:
                     continue
+                if wkt is None and geojson is None:
+                    failed += 1
+                    print(f"Could not repair {model.__tablename__} {record_key}:")
+                else:
+                    invalid += 1
+                    print(f"Invalid {model.__tablename__} {record_key}:")
+                for problem in problems:
+                    print(f"  {problem}")
+                if fix and (wkt is not None or geojson is not None):
+                    # through geometry_values so the repair lands in the
+                    # columns the current storage mode reads
+                    fixes.append(
+                        {key: record_key, **model.geometry_values(wkt, geojson)}
+                    )
+                    if len(fixes) >= batch_size:
+                        _write_geometry_fixes(model, fixes)
+                        fixes = []
+            if fixes:
+                _write_geometry_fixes(model, fixes)
+            db.session.commit()
+            print(
+                f"{model.__tablename__}: checked {checked}, invalid {invalid}, unrepairable {failed}",
+                "(repaired)" if fix else "(dry run)",
+            )
 
-    try:
+
+def _write_geometry_fixes(model, fixes):
+    db.session.execute(update(model), fixes)
+    print(f"Wrote {len(fixes)} repaired geometries to {model.__tablename__}")
+
+
+def _bounded_map(executor, fn, iterable, max_in_flight):
+    """
+    Like executor.map but keeps at most max_in_flight tasks queued and yields
+    results as they complete, so large inputs are streamed rather than
+    submitted all at once
+    """
+    in_flight = set()
+    for item in iterable:
+        in_flight.add(executor.submit(fn, item))
+        if len(in_flight) >= max_in_flight:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    for future in as_completed(in_flight):
+        yield future.result()
+
+
+@data_cli.command("compact-geometries")
+@click.option(
+    "--precision",
+    type=int,
+    default=None,
+    help="Decimal places to keep, defaults to the GEOMETRY_PRECISION setting",
+)
+@click.option(
+    "--expand",
+    is_flag=True,
+    default=False,
+    help="Write WKT and GeoJSON back from the stored WKB instead",
+)
+@click.option("--batch-size", type=int, default=100, help="Rows per batched update")
+def compact_geometries(precision, expand, batch_size):
+    """Convert stored WKT and GeoJSON to a single quantized WKB column, or back again"""
+    from application.geometry import (
+        decode_wkb,
+        encode_wkb,
+        shape_to_geojson,
+        shape_to_wkt,
+        to_shape,
+    )
+
+    if precision is None:
+        precision = current_app.config["GEOMETRY_PRECISION"]
+
+    targets = [
+        (LocalPlanBoundary, LocalPlanBoundary.reference, "reference"),
+        (Organisation, Organisation.organisation, "organisation"),
+    ]
+    for model, key_column, key in targets:
+        if expand:
+            query = select(key_column, model.geometry_wkb).where(
+                model.geometry_wkb.isnot(None)
+            )
+        else:
+            query = select(key_column, model.geometry, model.geojson).where(
+                or_(model.geometry.isnot(None), model.geojson.isnot(None))
+            )
+        count = 0
+        batch = []
+        for row in db.session.execute(query.execution_options(yield_per=batch_size)):
+            try:
+                if expand:
+                    geometry = decode_wkb(row[1])
+                    values = {
+                        "_geometry": shape_to_wkt(geometry, precision),
+                        "_geojson": shape_to_geojson(geometry),
+                        "geometry_wkb": None,
+                    }
+                else:
+                    geometry = to_shape(row[1], row[2])
+                    values = {
+                        "_geometry": None,
+                        "_geojson": None,
+                        "geometry_wkb": encode_wkb(geometry, precision),
+                    }
+            except Exception as e:
+                print(f"Skipping {model.__tablename__} {row[0]}: {e}")
+                continue
+            values[key] = row[0]
+            batch.append(values)
+            if len(batch) >= batch_size:
+                db.session.execute(update(model), batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            db.session.execute(update(model), batch)
+            count += len(batch)
         db.session.commit()
-        print(f"\nSuccessfully set end date for {end_date_count} duplicate documents")
-    except Exception as e:
-        db.session.rollback()
-        print(f"Error committing changes: {str(e)}")
+        print(
+            f"{'Expanded' if expand else 'Compacted'} {count} {model.__tablename__} geometries"
+        )
+
+    if not expand:
+        print(
+            "Run VACUUM FULL local_plan_boundary, organisation to return the freed space"
+        )
@@ -31,6 +31,21 @@ class Config(object):
     SAFE_URLS = set(os.getenv("SAFE_URLS", "").split(","))
     LOCAL_PLANS_REPO_NAME = os.getenv("LOCAL_PLANS_REPO_NAME")
     LOCAL_PLANS_REPO_DATA_PATH = os.getenv("LOCAL_PLANS_REPO_DATA_PATH")
+    HTTP_CACHE_DIR = os.getenv(
+        "HTTP_CACHE_DIR", os.path.join(PROJECT_ROOT, "data", "cache", "http")
+    )
+    DATASETTE_URL = os.getenv("DATASETTE_URL", "https://datasette.planning.data.gov.uk")
+    PLANNING_DATA_URL = os.getenv(
+        "PLANNING_DATA_URL", "https://www.planning.data.gov.uk"
+    )
+    COMPACT_GEOMETRY_STORAGE = _to_boolean(os.getenv("COMPACT_GEOMETRY_STORAGE", False))
+    # decimal places kept for coordinates, 6 is roughly 0.1m
+    GEOMETRY_PRECISION = int(os.getenv("GEOMETRY_PRECISION", 6))
+    BOUNDARY_INDEX_CHECK_INTERVAL = int(os.getenv("BOUNDARY_INDEX_CHECK_INTERVAL", 60))
+    # discover-documents stops reading a page after this many bytes
+    DISCOVERY_MAX_PAGE_BYTES = int(
+        os.getenv("DISCOVERY_MAX_PAGE_BYTES", 5 * 1024 * 1024)
+    )
 
 
 class DevelopmentConfig(Config):
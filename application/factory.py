@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 """The app module, containing the app factory function."""
+
 import os
 
 from flask import Flask, render_template
@@ -37,6 +38,7 @@ def register_errorhandlers(app):
 
 
 def register_blueprints(app):
+    from application.blueprints.api.views import api
     from application.blueprints.auth.views import auth
     from application.blueprints.boundary.views import boundary
     from application.blueprints.document.views import document
@@ -54,6 +56,7 @@ def register_blueprints(app):
     app.register_blueprint(boundary)
     app.register_blueprint(timetable)
     app.register_blueprint(export)
+    app.register_blueprint(api)
 
 
 def register_extensions(app):
@@ -0,0 +1,147 @@
+"""Shared HTTP session setup for commands that call upstream data services"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from application.metrics import record_http
+
+# (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT = (5, 30)
+
+
+class TimeoutSession(requests.Session):
+    def __init__(self, timeout=DEFAULT_TIMEOUT):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, *args, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        resp = super().request(*args, **kwargs)
+        if kwargs.get("stream"):
+            record_http(int(resp.headers.get("Content-Length") or 0))
+        else:
+            record_http(len(resp.content))
+        return resp
+
+
+def make_session(
+    pool_size=10,
+    retries=3,
+    backoff_factor=0.5,
+    timeout=DEFAULT_TIMEOUT,
+    raise_on_status=True,
+):
+    """
+    Return a session with a connection pool big enough to share between
+    pool_size threads, retrying idempotent requests on connection errors
+    and 429/5xx responses. With raise_on_status False the last 429/5xx
+    response is returned once retries run out instead of raising RetryError.
+    """
+    session = TimeoutSession(timeout=timeout)
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET", "HEAD"),
+        raise_on_status=raise_on_status,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class CachedResponse:
+    def __init__(self, url, content, links, sha256):
+        self.url = url
+        self.content = content
+        self.links = links
+        self.sha256 = sha256
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class HTTPCache:
+    """
+    Stores responses on disk keyed by URL and revalidates them with
+    If-None-Match/If-Modified-Since, so unchanged payloads aren't downloaded
+    again. Responses carry the sha256 of their body; whether that payload has
+    already been loaded is for the caller to decide (see reference_data_load),
+    the cache only knows what was last downloaded.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode()).hexdigest()
+        return self.directory / f"{key}.json", self.directory / f"{key}.body"
+
+    def _write(self, path, content):
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_bytes(content)
+        os.replace(tmp, path)
+
+    def get(self, session, url, params=None):
+        url = requests.Request("GET", url, params=params).prepare().url
+        meta_path, body_path = self._paths(url)
+        meta = None
+        if meta_path.exists() and body_path.exists():
+            meta = json.loads(meta_path.read_text())
+
+        headers = {}
+        if meta is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        resp = session.get(url, headers=headers)
+        if resp.status_code == 304 and meta is not None:
+            return CachedResponse(
+                url, body_path.read_bytes(), meta["links"], meta["sha256"]
+            )
+        resp.raise_for_status()
+
+        digest = hashlib.sha256(resp.content).hexdigest()
+        links = {rel: link["url"] for rel, link in resp.links.items()}
+        self._write(body_path, resp.content)
+        self._write(
+            meta_path,
+            json.dumps(
+                {
+                    "url": url,
+                    "etag": resp.headers.get("ETag"),
+                    "last_modified": resp.headers.get("Last-Modified"),
+                    "sha256": digest,
+                    "links": links,
+                }
+            ).encode(),
+        )
+        return CachedResponse(url, resp.content, links, digest)
+
+    def get_json_pages(self, session, url, params=None):
+        """
+        Fetch every page of a paginated JSON array (as returned by datasette
+        with _shape=array) through the cache by following the Link: rel="next"
+        headers, returning the rows and a sha256 covering every page
+        """
+        rows = []
+        digest = hashlib.sha256()
+        while url:
+            resp = self.get(session, url, params=params)
+            rows.extend(resp.json())
+            digest.update(resp.sha256.encode())
+            url = resp.links.get("next")
+            params = None
+        return rows, digest.hexdigest()
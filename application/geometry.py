@@ -0,0 +1,163 @@
+import shapely
+from shapely import from_wkt, make_valid
+from shapely.geometry import MultiPolygon, mapping, shape
+from shapely.ops import unary_union
+from shapely.validation import explain_validity
+
+
+def geojson_to_shape(geojson):
+    if geojson is None:
+        return None
+    if geojson["type"] == "FeatureCollection":
+        geometries = [
+            shape(feature["geometry"])
+            for feature in geojson["features"]
+            if feature.get("geometry")
+        ]
+        if not geometries:
+            return None
+        return unary_union(geometries)
+    if geojson["type"] == "Feature":
+        if not geojson.get("geometry"):
+            return None
+        return shape(geojson["geometry"])
+    return shape(geojson)
+
+
+def to_shape(wkt=None, geojson=None, wkb=None):
+    """
+    Return a shapely geometry from whichever representation is available,
+    preferring WKB then WKT as they are cheaper to parse than GeoJSON
+    """
+    if wkb:
+        return decode_wkb(wkb)
+    if wkt:
+        return from_wkt(wkt)
+    return geojson_to_shape(geojson)
+
+
+def to_polygonal(geometry):
+    """
+    Reduce the output of make_valid to polygons, dropping any lines or points
+    left over from collapsed rings
+    """
+    if geometry.geom_type in ("Polygon", "MultiPolygon"):
+        return geometry
+    polygons = []
+    for part in getattr(geometry, "geoms", []):
+        if part.geom_type == "Polygon":
+            polygons.append(part)
+        elif part.geom_type in ("MultiPolygon", "GeometryCollection"):
+            reduced = to_polygonal(part)
+            polygons.extend(getattr(reduced, "geoms", [reduced]))
+    return MultiPolygon([p for p in polygons if not p.is_empty])
+
+
+class Unrepairable(ValueError):
+    """make_valid left no polygon, as with a ring that encloses no area"""
+
+
+def _repair_shape(geometry):
+    if geometry.is_valid:
+        return None, None
+    reason = explain_validity(geometry)
+    repaired = to_polygonal(make_valid(geometry))
+    if repaired.is_empty:
+        raise Unrepairable(f"{reason}, no polygon left after repair")
+    return repaired, reason
+
+
+def _repair_geojson(geojson):
+    if geojson["type"] == "FeatureCollection":
+        features = []
+        reasons = []
+        for feature in geojson["features"]:
+            repaired, reason = _repair_geojson(feature)
+            if repaired is None:
+                features.append(feature)
+            else:
+                features.append(repaired)
+                reasons.extend(reason)
+        if not reasons:
+            return None, []
+        return {**geojson, "features": features}, reasons
+    if geojson["type"] == "Feature":
+        if not geojson.get("geometry"):
+            return None, []
+        repaired, reasons = _repair_geojson(geojson["geometry"])
+        if repaired is None:
+            return None, []
+        return {**geojson, "geometry": repaired}, reasons
+    repaired, reason = _repair_shape(shape(geojson))
+    if repaired is None:
+        return None, []
+    return mapping(repaired), [reason]
+
+
+def repair_geometry(record):
+    """
+    Check the WKT, GeoJSON and WKB of a (key, wkt, geojson, wkb) record,
+    returning the key, a list of problems found and the repaired WKT and
+    GeoJSON. Both are None if nothing needed repairing or the geometry
+    couldn't be repaired, which includes repairs that would leave it empty;
+    otherwise they are the whole corrected geometry, keeping whichever
+    representation was already valid, ready to store with geometry_values.
+    Compact records only have WKB, their repair comes back as WKT.
+
+    Runs in worker processes so must only use its arguments.
+    """
+    key, wkt, geojson, wkb = record
+    problems = []
+    repaired_wkt = None
+    repaired_geojson = None
+    part = "wkb" if wkb else "geometry"
+    try:
+        geometry = decode_wkb(wkb) if wkb else from_wkt(wkt) if wkt else None
+        if geometry is not None:
+            repaired, reason = _repair_shape(geometry)
+            if repaired is not None:
+                if repaired.geom_type == "Polygon":
+                    repaired = MultiPolygon([repaired])
+                repaired_wkt = repaired.wkt
+                problems.append(f"{part}: {reason}")
+        if geojson:
+            part = "geojson"
+            repaired_geojson, reasons = _repair_geojson(geojson)
+            problems.extend(f"geojson: {reason}" for reason in reasons)
+    except Unrepairable as e:
+        return key, [*problems, f"{part}: {e}"], None, None
+    except Exception as e:
+        return key, [f"unreadable: {e}"], None, None
+    if not problems:
+        return key, problems, None, None
+    if repaired_wkt is None and geometry is not None and not wkb:
+        repaired_wkt = wkt
+    if repaired_geojson is None:
+        repaired_geojson = geojson
+    return key, problems, repaired_wkt, repaired_geojson
+
+
+def quantize(geometry, precision):
+    """Snap coordinates to a grid of the given number of decimal places"""
+    return shapely.set_precision(geometry, 10**-precision)
+
+
+def encode_wkb(geometry, precision):
+    return shapely.to_wkb(quantize(geometry, precision))
+
+
+def decode_wkb(wkb):
+    return shapely.from_wkb(wkb)
+
+
+def shape_to_wkt(geometry, precision):
+    return shapely.to_wkt(geometry, rounding_precision=precision, trim=True)
+
+
+def shape_to_geojson(geometry):
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {"type": "Feature", "geometry": mapping(geometry), "properties": {}}
+        ],
+    }
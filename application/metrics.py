@@ -0,0 +1,286 @@
+"""
+Instrumentation for flask data commands.
+
+Every command registered on an InstrumentedGroup gets --metrics-json and
+--verbose options and reports its wall time, rows, rows/sec, SQL statements,
+HTTP requests and bytes, and the process peak RSS when it finishes. Commands
+can split their work into phases with
+
+    with phase("fetch") as p:
+        ...
+        p.rows = len(rows)
+
+and print per row detail with verbose(...), which only prints under --verbose.
+
+SQL statements are counted on the app's engine only while an instrumented
+command runs. SQL and HTTP counts are process wide, so phases running at the
+same time in different threads (as load-all steps do) include each other's
+calls.
+"""
+
+import functools
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+import click
+from flask import current_app, has_app_context
+from flask.cli import AppGroup
+from sqlalchemy import event
+
+from application.extensions import db
+
+try:
+    import resource
+except ImportError:  # not available on windows
+    resource = None
+
+
+class Counters:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.sql = 0
+        self.http_requests = 0
+        self.http_bytes = 0
+
+    def add(self, sql=0, http_requests=0, http_bytes=0):
+        with self._lock:
+            self.sql += sql
+            self.http_requests += http_requests
+            self.http_bytes += http_bytes
+
+    def snapshot(self):
+        with self._lock:
+            return self.sql, self.http_requests, self.http_bytes
+
+
+counters = Counters()
+
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    counters.add(sql=1)
+
+
+@contextmanager
+def _counting_statements():
+    """Count statements run on the app's engine, if there is one, until exit"""
+    engine = None
+    if has_app_context() and "sqlalchemy" in current_app.extensions:
+        engine = db.engine
+        event.listen(engine, "before_cursor_execute", _count_statement)
+    try:
+        yield
+    finally:
+        if engine is not None:
+            event.remove(engine, "before_cursor_execute", _count_statement)
+
+
+def record_http(nbytes):
+    counters.add(http_requests=1, http_bytes=nbytes)
+
+
+def process_peak_rss():
+    """
+    Peak resident set size of this process in bytes since it started, so a
+    phase reports the high water mark up to its end rather than its own use
+    """
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macos
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+class Phase:
+    def __init__(self, name):
+        self.name = name
+        self.rows = None
+        self.seconds = 0.0
+        self.sql = 0
+        self.http_requests = 0
+        self.http_bytes = 0
+        self.process_peak_rss = None
+        self._started = None
+        self._counters = None
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._counters = counters.snapshot()
+
+    def stop(self):
+        self.seconds = time.perf_counter() - self._started
+        sql, http_requests, http_bytes = counters.snapshot()
+        self.sql = sql - self._counters[0]
+        self.http_requests = http_requests - self._counters[1]
+        self.http_bytes = http_bytes - self._counters[2]
+        self.process_peak_rss = process_peak_rss()
+
+    @property
+    def rows_per_second(self):
+        if self.rows is None or not self.seconds:
+            return None
+        return self.rows / self.seconds
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "seconds": round(self.seconds, 3),
+            "rows": self.rows,
+            "rows_per_second": (
+                None if self.rows_per_second is None else round(self.rows_per_second, 1)
+            ),
+            "sql_statements": self.sql,
+            "http_requests": self.http_requests,
+            "http_bytes": self.http_bytes,
+            "process_peak_rss_bytes": self.process_peak_rss,
+        }
+
+
+class Metrics:
+    def __init__(self, command, verbose=False):
+        self.command = command
+        self.verbose = verbose
+        self.total = Phase(command)
+        self.phases = []
+        self.commands = []
+        self._lock = threading.Lock()
+
+    def add_command(self, metrics):
+        with self._lock:
+            self.commands.append(metrics)
+
+    def to_dict(self):
+        return {
+            "command": self.command,
+            **self.total.to_dict(),
+            "phases": [p.to_dict() for p in self.phases],
+            "commands": [m.to_dict() for m in self.commands],
+        }
+
+    def summary(self):
+        lines = [
+            f"{'phase':<24} {'seconds':>8} {'rows':>8} {'rows/s':>9} "
+            f"{'sql':>6} {'http':>5} {'http MB':>8} {'proc peak MB':>12}"
+        ]
+        for label, p in self._rows():
+            lines.append(
+                f"{label:<24} {p.seconds:>8.2f} {_blank(p.rows):>8} "
+                f"{_blank(p.rows_per_second, '.1f'):>9} {p.sql:>6} "
+                f"{p.http_requests:>5} {p.http_bytes / 2**20:>8.2f} "
+                f"{_blank(p.process_peak_rss and p.process_peak_rss / 2**20, '.0f'):>12}"
+            )
+        return "\n".join(lines)
+
+    def _rows(self, indent=""):
+        yield indent + self.command, self.total
+        for p in self.phases:
+            yield f"{indent}  {p.name}", p
+        for metrics in self.commands:
+            yield from metrics._rows(indent + "  ")
+
+
+def _blank(value, spec=""):
+    return "" if value is None else format(value, spec)
+
+
+_current = ContextVar("metrics", default=None)
+
+
+def current_metrics():
+    return _current.get()
+
+
+def verbose(*args):
+    """print, but only when the command was run with --verbose"""
+    metrics = _current.get()
+    if metrics is not None and metrics.verbose:
+        print(*args)
+
+
+@contextmanager
+def phase(name):
+    p = Phase(name)
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.phases.append(p)
+    p.start()
+    try:
+        yield p
+    finally:
+        p.stop()
+
+
+def instrument(f):
+    """
+    Wrap a command callback to collect its metrics. A command invoked from
+    another instrumented command (as load-all does) adds its metrics to the
+    outer command's report instead of printing its own.
+    """
+
+    @functools.wraps(f)
+    def wrapper(*args, metrics_json=None, verbose=False, **kwargs):
+        ctx = click.get_current_context()
+        outer = ctx.meta.get("metrics")
+        metrics = Metrics(ctx.command.name, verbose=verbose)
+        if outer is None:
+            ctx.meta["metrics"] = metrics
+        token = _current.set(metrics)
+        # nested commands share the engine, so only the outer command listens
+        counting = _counting_statements() if outer is None else nullcontext()
+        metrics.total.start()
+        try:
+            with counting:
+                result = f(*args, **kwargs)
+            if isinstance(result, int) and not isinstance(result, bool):
+                metrics.total.rows = result
+        finally:
+            metrics.total.stop()
+            _current.reset(token)
+            # a command that fails still reports how far it got
+            if outer is not None:
+                outer.add_command(metrics)
+            else:
+                _report(metrics, metrics_json)
+        return result
+
+    wrapper.__click_params__ = list(getattr(f, "__click_params__", []))
+    wrapper = click.option(
+        "--verbose",
+        is_flag=True,
+        default=False,
+        help="Print detail for every row processed",
+    )(wrapper)
+    wrapper = click.option(
+        "--metrics-json",
+        "metrics_json",
+        type=click.Path(dir_okay=False, allow_dash=True),
+        default=None,
+        help="Write the run's metrics as JSON to this file ('-' for stdout) instead of a summary",
+    )(wrapper)
+    return wrapper
+
+
+def _report(metrics, metrics_json):
+    sys.stdout.flush()
+    if metrics_json == "-":
+        click.echo(json.dumps(metrics.to_dict(), indent=2))
+    elif metrics_json:
+        with open(metrics_json, "w") as file:
+            json.dump(metrics.to_dict(), file, indent=2)
+    else:
+        click.echo(f"\n{metrics.summary()}")
+
+
+class InstrumentedGroup(AppGroup):
+    """AppGroup whose commands are all wrapped with instrument"""
+
+    def command(self, *args, **kwargs):
+        decorator = super().command(*args, **kwargs)
+
+        def instrumented(f):
+            return decorator(instrument(f))
+
+        return instrumented
@@ -2,12 +2,30 @@ import datetime
 from enum import Enum
 from typing import List, Optional
 
-from sqlalchemy import Date, DateTime, ForeignKey, Integer, Text
+from flask import current_app, has_app_context
+from sqlalchemy import (
+    BigInteger,
+    Date,
+    DateTime,
+    ForeignKey,
+    Integer,
+    LargeBinary,
+    Text,
+    or_,
+)
 from sqlalchemy.dialects.postgresql import ARRAY, ENUM, JSONB
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.ext.mutable import MutableDict
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from application.extensions import db
+from application.geometry import (
+    decode_wkb,
+    encode_wkb,
+    shape_to_geojson,
+    shape_to_wkt,
+    to_shape,
+)
 
 
 class Status(Enum):
@@ -63,7 +81,10 @@ document_organisation = db.Table(
     db.Column(
         "local_plan_document_reference",
         Text,
-        ForeignKey("local_plan_document.reference"),
+        # deferrable so fix-duplicate-document-references can rename documents
+        ForeignKey(
+            "local_plan_document.reference", deferrable=True, initially="IMMEDIATE"
+        ),
         nullable=False,
     ),
     db.Column(
@@ -76,6 +97,141 @@ document_organisation = db.Table(
 )
 
 
+def compact_geometry_settings():
+    if not has_app_context():
+        return False, 6
+    return (
+        current_app.config.get("COMPACT_GEOMETRY_STORAGE", False),
+        current_app.config.get("GEOMETRY_PRECISION", 6),
+    )
+
+
+class GeometryMixin:
+    """
+    Geometry stored either as WKT text plus GeoJSON, or in compact mode as a
+    single quantized WKB column from which WKT and GeoJSON are derived on
+    first access and cached on the instance.
+
+    In compact mode setting geometry or geojson encodes the value to WKB and
+    clears the text columns; setting either to None leaves the WKB alone.
+    """
+
+    # deferred so pages that only need names and codes don't load the blobs,
+    # use undefer_group("geography") where the geometry is needed
+    _geometry: Mapped[Optional[str]] = mapped_column(
+        "geometry", Text, deferred=True, deferred_group="geography"
+    )
+    _geojson: Mapped[Optional[dict]] = mapped_column(
+        "geojson",
+        JSONB(none_as_null=True),
+        deferred=True,
+        deferred_group="geography",
+    )
+    geometry_wkb: Mapped[Optional[bytes]] = mapped_column(
+        LargeBinary, deferred=True, deferred_group="geography"
+    )
+
+    def _derived(self, kind):
+        wkb = self.geometry_wkb
+        cached = self.__dict__.get("_derived_geometry")
+        if cached is None or cached[0] is not wkb:
+            cached = (wkb, {})
+            self.__dict__["_derived_geometry"] = cached
+        values = cached[1]
+        if kind not in values:
+            geometry = values.get("shape")
+            if geometry is None:
+                geometry = values["shape"] = decode_wkb(wkb)
+            if kind == "wkt":
+                values["wkt"] = shape_to_wkt(geometry, compact_geometry_settings()[1])
+            elif kind == "geojson":
+                values["geojson"] = shape_to_geojson(geometry)
+        return values[kind]
+
+    def _store_compact(self, geometry):
+        compact, precision = compact_geometry_settings()
+        if not compact:
+            return False
+        if geometry is not None:
+            self.geometry_wkb = encode_wkb(geometry, precision)
+            self._geometry = None
+            self._geojson = None
+        return True
+
+    @hybrid_property
+    def geometry(self) -> Optional[str]:
+        if self._geometry is None and self.geometry_wkb is not None:
+            return self._derived("wkt")
+        return self._geometry
+
+    @geometry.inplace.setter
+    def _set_geometry(self, value):
+        if not self._store_compact(to_shape(wkt=value) if value else None):
+            self._geometry = value
+            if value is not None:
+                self.geometry_wkb = None
+        elif value is None:
+            self._geometry = None
+
+    @geometry.inplace.expression
+    @classmethod
+    def _geometry_expression(cls):
+        return cls._geometry
+
+    @hybrid_property
+    def geojson(self) -> Optional[dict]:
+        if self._geojson is None and self.geometry_wkb is not None:
+            return self._derived("geojson")
+        return self._geojson
+
+    @geojson.inplace.setter
+    def _set_geojson(self, value):
+        if not self._store_compact(to_shape(geojson=value) if value else None):
+            self._geojson = value
+            if value is not None:
+                self.geometry_wkb = None
+        elif value is None:
+            self._geojson = None
+
+    @geojson.inplace.expression
+    @classmethod
+    def _geojson_expression(cls):
+        return cls._geojson
+
+    @classmethod
+    def geometry_values(cls, wkt=None, geojson=None):
+        """
+        Column values for storing a geometry with a bulk insert or update,
+        which bypasses the geometry and geojson setters
+        """
+        compact, precision = compact_geometry_settings()
+        if not compact:
+            return {"_geometry": wkt, "_geojson": geojson, "geometry_wkb": None}
+        geometry = to_shape(wkt, geojson)
+        return {
+            "_geometry": None,
+            "_geojson": None,
+            "geometry_wkb": (
+                encode_wkb(geometry, precision) if geometry is not None else None
+            ),
+        }
+
+    @property
+    def shape(self):
+        if self.geometry_wkb is not None:
+            return self._derived("shape")
+        return to_shape(self._geometry, self._geojson)
+
+    @hybrid_property
+    def has_geometry(self):
+        return self._geometry is not None or self.geometry_wkb is not None
+
+    @has_geometry.inplace.expression
+    @classmethod
+    def _has_geometry_expression(cls):
+        return cls._geometry.isnot(None) | cls.geometry_wkb.isnot(None)
+
+
 class BaseModel(DateModel):
     __abstract__ = True
 
@@ -88,13 +244,9 @@ class LocalPlanDocumentType(BaseModel):
     __tablename__ = "local_plan_document_type"
 
 
-class LocalPlanBoundary(BaseModel):
+class LocalPlanBoundary(GeometryMixin, BaseModel):
     __tablename__ = "local_plan_boundary"
 
-    geometry: Mapped[Optional[str]] = mapped_column(Text)
-
-    geojson: Mapped[Optional[dict]] = mapped_column(JSONB)
-
     organisations = db.relationship(
         "Organisation",
         secondary=boundary_organisation,
@@ -201,6 +353,24 @@ class LocalPlanDocument(BaseModel):
 
     status: Mapped[Status] = mapped_column(ENUM(Status), default=Status.FOR_REVIEW)
 
+    # results of the last check-links run against document_url
+    link_status: Mapped[Optional[int]] = mapped_column(Integer)
+    link_final_url: Mapped[Optional[str]] = mapped_column(Text)
+    link_content_type: Mapped[Optional[str]] = mapped_column(Text)
+    link_content_length: Mapped[Optional[int]] = mapped_column(BigInteger)
+    link_error: Mapped[Optional[str]] = mapped_column(Text)
+    link_checked_date: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime)
+    documentation_link_status: Mapped[Optional[int]] = mapped_column(Integer)
+
+    # sha256 and size of the file at document_url from fingerprint-documents
+    content_hash: Mapped[Optional[str]] = mapped_column(Text, index=True)
+    content_size: Mapped[Optional[int]] = mapped_column(BigInteger)
+    content_hashed_date: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime)
+
+    @property
+    def link_ok(self):
+        return self.link_status is not None and self.link_status < 400
+
     def get_document_types(self):
         doc_types = (
             LocalPlanDocumentType.query.filter(
@@ -211,17 +381,34 @@ class LocalPlanDocument(BaseModel):
         )
         return doc_types
 
+    def get_same_content_documents(self):
+        """Other current documents, in any plan, whose file has the same content"""
+        if self.content_hash is None:
+            return []
+        return (
+            LocalPlanDocument.query.filter(
+                LocalPlanDocument.content_hash == self.content_hash,
+                LocalPlanDocument.end_date.is_(None),
+                or_(
+                    LocalPlanDocument.reference != self.reference,
+                    LocalPlanDocument.local_plan != self.local_plan,
+                ),
+            )
+            .order_by(LocalPlanDocument.local_plan, LocalPlanDocument.reference)
+            .all()
+        )
 
-class Organisation(DateModel):
+
+class Organisation(GeometryMixin, DateModel):
     __tablename__ = "organisation"
 
     organisation: Mapped[str] = mapped_column(Text, primary_key=True)
     local_authority_type: Mapped[Optional[str]] = mapped_column(Text)
     name: Mapped[Optional[dict]] = mapped_column(Text, index=True)
     official_name: Mapped[Optional[dict]] = mapped_column(Text)
-    geometry: Mapped[Optional[str]] = mapped_column(Text)
-    geojson: Mapped[Optional[dict]] = mapped_column(JSONB)
-    point: Mapped[Optional[str]] = mapped_column(Text)
+    point: Mapped[Optional[str]] = mapped_column(
+        Text, deferred=True, deferred_group="geography"
+    )
     statistical_geography: Mapped[Optional[str]] = mapped_column(Text)
     website: Mapped[Optional[str]] = mapped_column(Text)
 
@@ -283,3 +470,54 @@ class LocalPlanTimetable(BaseModel):
         if event_type is None:
             return ""
         return event_type.name
+
+
+class ReferenceDataLoad(db.Model):
+    """sha256 of the last payload loaded for each reference dataset"""
+
+    __tablename__ = "reference_data_load"
+
+    dataset: Mapped[str] = mapped_column(Text, primary_key=True)
+    sha256: Mapped[str] = mapped_column(Text)
+    loaded_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime, default=datetime.datetime.now
+    )
+
+
+class DocumentCandidate(db.Model):
+    """Documents found by discover-documents, waiting to be reviewed"""
+
+    __tablename__ = "document_candidate"
+
+    local_plan: Mapped[str] = mapped_column(
+        ForeignKey("local_plan.reference"), primary_key=True
+    )
+    document_url: Mapped[str] = mapped_column(Text, primary_key=True)
+    name: Mapped[Optional[str]] = mapped_column(Text)
+    documentation_url: Mapped[Optional[str]] = mapped_column(Text)
+    document_type: Mapped[Optional[str]] = mapped_column(Text)
+    found_date: Mapped[datetime.datetime] = mapped_column(
+        DateTime, default=datetime.datetime.now
+    )
+
+
+class CrawlCache(db.Model):
+    """
+    Links extracted from each page discover-documents has fetched, with the
+    validators needed to make the next fetch conditional
+    """
+
+    __tablename__ = "crawl_cache"
+
+    url: Mapped[str] = mapped_column(Text, primary_key=True)
+    etag: Mapped[Optional[str]] = mapped_column(Text)
+    last_modified: Mapped[Optional[str]] = mapped_column(Text)
+    content_hash: Mapped[str] = mapped_column(Text)
+    documents: Mapped[list] = mapped_column(JSONB)
+    pages: Mapped[list] = mapped_column(JSONB)
+    fetched_date: Mapped[datetime.datetime] = mapped_column(
+        DateTime, default=datetime.datetime.now
+    )
+    checked_date: Mapped[datetime.datetime] = mapped_column(
+        DateTime, default=datetime.datetime.now
+    )
@@ -1,55 +1,541 @@
+import codecs
+import hashlib
 import re
-from urllib.parse import urljoin
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from html.parser import HTMLParser
+from urllib.parse import urldefrag, urljoin, urlparse
 
-import requests
-from bs4 import BeautifulSoup
-from thefuzz import process
+import numpy as np
+from rapidfuzz import fuzz, process
+from thefuzz.utils import full_process
+
+from application.fetch import make_session
+
+DOCUMENT_HREF_HINTS = ["pdf", "doc", "document", "file"]
+
+# same-site pages worth following one level down from a plan's documentation page
+FOLLOW_HINTS = [
+    "local-plan",
+    "local plan",
+    "localplan",
+    "evidence",
+    "examination",
+    "submission",
+    "adopted",
+    "policies",
+    "policy",
+]
 
 
 def extract_links_from_page(url, plan, reference_data):
     try:
-        response = requests.get(url, verify=False)
-        response.raise_for_status()
+        with make_session() as session:
+            links, _ = fetch_links(session, url)
     except Exception as e:
         print(f"Error fetching {url}: {e}")
         return []
 
-    soup = BeautifulSoup(response.content, "html.parser")
-    links = soup.find_all("a", href=True)
-    document_links = []
-    for link in links:
-        href = link["href"]
-        document_url = urljoin(url, href)  # ensure urls are absolute
-        if any(x in href.lower() for x in ["pdf", "doc", "document", "file"]):
-            name = link.get_text(strip=True)
-            name = clean_text(name)
-            match = process.extractOne(name, reference_data)
-            if match[1] > 85:
-                document_type = match[0]
-            else:
-                document_type = None
-
-            document_links.append(
-                {
-                    "name": name,
-                    "local_plan": plan.reference,
-                    "document_url": document_url,
-                    "documentation_url": url,
-                    "document_type": document_type,
-                }
+    document_types = DocumentTypeMatcher(reference_data).match_many(
+        [name for name, _ in links]
+    )
+    return [
+        {
+            "name": name,
+            "local_plan": plan.reference,
+            "document_url": document_url,
+            "documentation_url": url,
+            "document_type": document_type,
+        }
+        for (name, document_url), document_type in zip(links, document_types)
+    ]
+
+
+# pages are read CHUNK_SIZE bytes at a time and cut off after MAX_PAGE_BYTES
+# (DISCOVERY_MAX_PAGE_BYTES in the app config) so one enormous page can't
+# hold up a crawl worker
+CHUNK_SIZE = 64 * 1024
+MAX_PAGE_BYTES = 5 * 1024 * 1024
+
+CONTENT_RANGE_TOTAL = re.compile(r"/(\d+)$")
+META_CHARSET = re.compile(rb"""<meta[^>]+charset=["']?([\w-]+)""", re.IGNORECASE)
+
+# elements html.parser never expects an end tag for
+VOID_ELEMENTS = {
+    "area",
+    "base",
+    "basefont",
+    "bgsound",
+    "br",
+    "col",
+    "command",
+    "embed",
+    "frame",
+    "hr",
+    "image",
+    "img",
+    "input",
+    "isindex",
+    "keygen",
+    "link",
+    "menuitem",
+    "meta",
+    "nextid",
+    "param",
+    "source",
+    "spacer",
+    "track",
+    "wbr",
+}
+
+# text inside these isn't part of a link's text as far as BeautifulSoup's
+# get_text is concerned
+NON_TEXT_ELEMENTS = {"script", "style", "template", "rt", "rp"}
+
+
+class LinkParser(HTMLParser):
+    """
+    Collects the text and href of every <a href> on a page as it is fed,
+    without building a tree. Only the names of the open elements are kept so
+    that an end tag closes any links inside it, the way BeautifulSoup's
+    html.parser tree builder does with badly nested markup.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.links = []
+        self._open = []
+        self._text = []
+
+    def handle_starttag(self, tag, attrs):
+        self._flush_text()
+        if tag in VOID_ELEMENTS:
+            return
+        link = None
+        if tag == "a":
+            attrs = dict(attrs)
+            if "href" in attrs:
+                link = (attrs["href"] or "", [])
+                self.links.append(link)
+        self._open.append((tag, link))
+
+    def handle_endtag(self, tag):
+        self._flush_text()
+        for i in range(len(self._open) - 1, -1, -1):
+            if self._open[i][0] == tag:
+                del self._open[i:]
+                return
+
+    def handle_data(self, data):
+        # text can arrive in pieces when it spans two fed chunks
+        self._text.append(data)
+
+    def handle_comment(self, data):
+        self._flush_text()
+
+    handle_decl = handle_pi = handle_comment
+
+    def unknown_decl(self, data):
+        self._flush_text()
+        if data.startswith("CDATA["):
+            self._text.append(data[len("CDATA[") :])
+            self._flush_text()
+
+    def close(self):
+        super().close()
+        self._flush_text()
+
+    def _flush_text(self):
+        text = "".join(self._text).strip()
+        self._text = []
+        if not text or any(tag in NON_TEXT_ELEMENTS for tag, _ in self._open):
+            return
+        # nested links share their text with the links around them
+        for _, link in self._open:
+            if link is not None:
+                link[1].append(text)
+
+
+def parse_links(chunks, url):
+    """
+    Yield the text and absolute url of every <a href> in the html, given as
+    a string or an iterable of strings
+    """
+    parser = LinkParser()
+    if isinstance(chunks, str):
+        chunks = [chunks]
+    for chunk in chunks:
+        parser.feed(chunk)
+    parser.close()
+    for href, text in parser.links:
+        yield "".join(text), href, urljoin(url, href)
+
+
+def is_document_href(href):
+    return any(x in href.lower() for x in DOCUMENT_HREF_HINTS)
+
+
+def split_links(html, url):
+    """
+    Return the document links on a page and the same-site pages linked from
+    it that look worth following. html can be a string or an iterable of
+    strings.
+    """
+    documents = []
+    pages = []
+    host = urlparse(url).netloc
+    for text, href, absolute in parse_links(html, url):
+        if is_document_href(href):
+            documents.append((clean_text(text), absolute))
+            continue
+        absolute = urldefrag(absolute).url
+        parsed = urlparse(absolute)
+        if parsed.scheme not in ("http", "https") or parsed.netloc != host:
+            continue
+        if absolute == url:
+            continue
+        haystack = f"{parsed.path} {text}".lower()
+        if any(hint in haystack for hint in FOLLOW_HINTS):
+            pages.append(absolute)
+    return documents, list(dict.fromkeys(pages))
+
+
+class DocumentTypeMatcher:
+    """
+    Matches link names to document types, built once per crawl.
+
+    Gives the same answers as thefuzz's process.extractOne with its default
+    WRatio scorer and a score over 85, but the reference names are normalised
+    once and a whole page of names is scored against every type in a single
+    rapidfuzz cdist call. reference_data is a list of names or a dict of
+    reference to name, in which case the reference is returned.
+
+    workers is passed to cdist. It defaults to 1 as the crawler already runs
+    one matcher call per crawl thread; use -1 for one off batches.
+    """
+
+    threshold = 85
+
+    def __init__(self, reference_data, workers=1):
+        self.workers = workers
+        if isinstance(reference_data, dict):
+            self.results = list(reference_data.keys())
+            names = list(reference_data.values())
+        else:
+            self.results = list(reference_data)
+            names = self.results
+        self.choices = [full_process(name, force_ascii=True) for name in names]
+
+    def match(self, name):
+        return self.match_many([name])[0]
+
+    def match_many(self, names):
+        if not names or not self.choices:
+            return [None] * len(names)
+        queries = [full_process(full_process(name), force_ascii=True) for name in names]
+        # extractOne rounds the score before comparing it with the threshold,
+        # so a pair scoring under threshold + 0.5 can never match and WRatio
+        # can give up on it early
+        scores = process.cdist(
+            queries,
+            self.choices,
+            scorer=fuzz.WRatio,
+            dtype=np.float64,
+            score_cutoff=self.threshold + 0.5,
+            workers=self.workers,
+        )
+        best = scores.argmax(axis=1)
+        return [
+            (
+                self.results[choice]
+                if round(scores[row, choice]) > self.threshold
+                else None
+            )
+            for row, choice in enumerate(best)
+        ]
+
+
+class HostLimiter:
+    """
+    Limits concurrent requests to each host and spaces out requests to the
+    same host by at least delay seconds
+    """
+
+    def __init__(self, per_host=2, delay=0.5):
+        self.per_host = per_host
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._semaphores = {}
+        self._next_slot = {}
+
+    @contextmanager
+    def limit(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            semaphore = self._semaphores.setdefault(
+                host, threading.Semaphore(self.per_host)
+            )
+        with semaphore:
+            with self._lock:
+                now = time.monotonic()
+                slot = max(now, self._next_slot.get(host, now))
+                self._next_slot[host] = slot + self.delay
+            if slot > now:
+                time.sleep(slot - now)
+            yield
+
+
+def check_link(session, url):
+    """
+    Check a url with a HEAD request, falling back to a GET of the first byte
+    for servers that refuse, drop or mishandle HEAD. The session should be
+    made with raise_on_status=False so 429 and 5xx statuses are recorded. Returns the status, final url
+    after redirects, content type and length, or the error if it couldn't be
+    reached at all.
+    """
+    result = {
+        "status": None,
+        "final_url": None,
+        "content_type": None,
+        "content_length": None,
+        "error": None,
+        "checked_date": datetime.now(),
+    }
+    try:
+        # council sites often have broken certificate chains
+        response = session.head(url, allow_redirects=True, verify=False)
+    except Exception:
+        response = None
+    try:
+        if response is None or response.status_code >= 400:
+            response = session.get(
+                url, headers={"Range": "bytes=0-0"}, verify=False, stream=True
             )
-    return document_links
+            response.close()
+    except Exception as e:
+        result["error"] = str(e)
+        return result
+
+    result["status"] = response.status_code
+    result["final_url"] = response.url
+    result["content_type"] = response.headers.get("Content-Type")
+    result["content_length"] = content_length(response)
+    return result
+
+
+def content_length(response):
+    """The full size of the resource, from Content-Range for ranged responses"""
+    if response.status_code == 206:
+        match = CONTENT_RANGE_TOTAL.search(response.headers.get("Content-Range", ""))
+        return int(match.group(1)) if match else None
+    length = response.headers.get("Content-Length")
+    return int(length) if length and length.isdigit() else None
+
+
+def fingerprint(session, url):
+    """
+    Download a file a chunk at a time, returning the sha256 of its content
+    and its size in bytes without holding it in memory
+    """
+    digest = hashlib.sha256()
+    size = 0
+    # council sites often have broken certificate chains
+    with session.get(url, verify=False, stream=True) as response:
+        response.raise_for_status()
+        for chunk in response.iter_content(CHUNK_SIZE):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+class PageCache:
+    """
+    The links split_links found on each page at the last crawl, with the
+    ETag and Last-Modified needed to revalidate it. Shared between crawl
+    threads; entries changed during a crawl are collected by take_updates so
+    the caller can write them back.
+    """
+
+    def __init__(self, entries=()):
+        self._lock = threading.Lock()
+        self._entries = {entry["url"]: entry for entry in entries}
+        self._updates = {}
+        self.reused = 0
+        self.extracted = 0
+
+    def get(self, url):
+        with self._lock:
+            return self._entries.get(url)
+
+    def put(self, entry, reused):
+        with self._lock:
+            self._entries[entry["url"]] = entry
+            self._updates[entry["url"]] = entry
+            if reused:
+                self.reused += 1
+            else:
+                self.extracted += 1
+
+    def take_updates(self, minimum=1):
+        """Return and clear the changed entries once there are at least minimum"""
+        with self._lock:
+            if len(self._updates) < minimum:
+                return []
+            updates = list(self._updates.values())
+            self._updates = {}
+            return updates
+
+
+def read_body(response, max_bytes=MAX_PAGE_BYTES):
+    """
+    Read at most max_bytes of a streamed response in chunks, returning the
+    chunks and a sha256 of what was read
+    """
+    chunks = []
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in response.iter_content(CHUNK_SIZE):
+        chunk = chunk[: max_bytes - size]
+        digest.update(chunk)
+        chunks.append(chunk)
+        size += len(chunk)
+        if size >= max_bytes:
+            break
+    return chunks, digest.hexdigest()
+
+
+def page_encoding(response, head):
+    """
+    The charset from the Content-Type header, or a <meta charset> near the
+    start of the page, or utf-8
+    """
+    encoding = None
+    if "charset" in response.headers.get("Content-Type", "").lower():
+        encoding = response.encoding
+    elif match := META_CHARSET.search(head[:1024]):
+        encoding = match.group(1).decode("ascii")
+    try:
+        return codecs.lookup(encoding or "utf-8").name
+    except LookupError:
+        return "utf-8"
+
+
+def decode_chunks(chunks, encoding):
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    for chunk in chunks:
+        yield decoder.decode(chunk)
+    yield decoder.decode(b"", final=True)
+
+
+def fetch_links(session, url, cache=None, max_bytes=MAX_PAGE_BYTES):
+    """
+    Return split_links for a page, sending a conditional request when the
+    page is in the cache and reusing the cached links if the server says it
+    hasn't changed or sends back the same content. Only the first max_bytes
+    of the page are read.
+    """
+    entry = cache.get(url) if cache is not None else None
+    headers = {}
+    if entry is not None:
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    # council sites often have broken certificate chains
+    with session.get(url, headers=headers, verify=False, stream=True) as response:
+        now = datetime.now()
+        if response.status_code == 304 and entry is not None:
+            cache.put({**entry, "checked_date": now}, reused=True)
+            return entry["documents"], entry["pages"]
+        response.raise_for_status()
+        chunks, content_hash = read_body(response, max_bytes)
+
+    validators = {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "checked_date": now,
+    }
+    if entry is not None and entry["content_hash"] == content_hash:
+        cache.put({**entry, **validators}, reused=True)
+        return entry["documents"], entry["pages"]
+
+    encoding = page_encoding(response, chunks[0] if chunks else b"")
+    documents, pages = split_links(decode_chunks(chunks, encoding), url)
+    # lists rather than tuples so fresh and cached (JSON) entries look the same
+    documents = [list(document) for document in documents]
+    if cache is not None:
+        cache.put(
+            {
+                "url": url,
+                "content_hash": content_hash,
+                "documents": documents,
+                "pages": pages,
+                "fetched_date": now,
+                **validators,
+            },
+            reused=False,
+        )
+    return documents, pages
+
+
+def crawl_plan(
+    session,
+    limiter,
+    reference,
+    url,
+    matcher,
+    max_pages=20,
+    cache=None,
+    max_bytes=MAX_PAGE_BYTES,
+):
+    """
+    Find candidate documents on a plan's documentation page and on up to
+    max_pages same-site pages it links to, returning a list of candidate dicts
+    and a list of errors. Pages are revalidated against cache if given and
+    only their first max_bytes are read.
+    """
+    candidates = {}
+    errors = []
+
+    def visit(page_url):
+        try:
+            with limiter.limit(page_url):
+                documents, pages = fetch_links(session, page_url, cache, max_bytes)
+        except Exception as e:
+            errors.append(f"{page_url}: {e}")
+            return []
+        documents = [d for d in documents if d[1] not in candidates]
+        document_types = matcher.match_many([name for name, _ in documents])
+        for (name, document_url), document_type in zip(documents, document_types):
+            candidates[document_url] = {
+                "local_plan": reference,
+                "document_url": document_url,
+                "name": name,
+                "documentation_url": page_url,
+                "document_type": document_type,
+            }
+        return pages
+
+    for page_url in visit(url)[:max_pages]:
+        visit(page_url)
+    return list(candidates.values()), errors
+
+
+NON_ASCII = re.compile(r"[^\x00-\x7F]+")
+PDF_TAG = re.compile(r"\[\s*pdf\s*\]", flags=re.IGNORECASE)
+WHITESPACE = re.compile(r"\s+")
+FILE_SIZE = re.compile(r"\(\d+(,\d{3})?KB\)|\d+(,\d{3})?KB|\d+MB")
 
 
 def clean_text(text):
-    text = re.sub(
-        r"[^\x00-\x7F]+", "'", text
-    )  # replace all non-ASCII characters with an apostrophe
-    text = re.sub(r"\[\s*pdf\s*\]", "", text, flags=re.IGNORECASE)  # remove [pdf] tags
-    text = re.sub(r"\s+", " ", text)  # normalize any excessive spaces
-    text = re.sub(
-        r"\(\d+(,\d{3})?KB\)|\d+(,\d{3})?KB|\d+MB", "", text
-    )  # remove file sizes like (63KB), 63KB, or 12MB
+    # replace all non-ASCII characters with an apostrophe
+    text = NON_ASCII.sub("'", text)
+    text = PDF_TAG.sub("", text)  # remove [pdf] tags
+    text = WHITESPACE.sub(" ", text)  # normalize any excessive spaces
+    text = FILE_SIZE.sub("", text)  # remove file sizes like (63KB), 63KB, or 12MB
     words = text.split()
     cleaned_words = [
         word.rstrip("'") for word in words
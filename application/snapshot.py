@@ -0,0 +1,167 @@
+"""
+Reference data snapshots.
+
+A snapshot is a tar.gz holding one CSV per reference table, written with COPY
+in primary key order, and a manifest.json recording the snapshot format, the
+database revision it was taken from and each table's columns, row count and
+sha256. Loading COPYs each CSV into a temporary staging table and merges it
+into the real table, so a database can be bootstrapped without any network.
+"""
+
+import hashlib
+import io
+import json
+import os
+import tarfile
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+
+from application.models import LocalPlanDocumentType, LocalPlanEventType, Organisation
+
+SNAPSHOT_FORMAT = 1
+
+# in load order, organisations carry their geographies
+SNAPSHOT_MODELS = [Organisation, LocalPlanDocumentType, LocalPlanEventType]
+
+
+class SnapshotError(Exception):
+    pass
+
+
+class HashingReader:
+    """File wrapper that hashes everything read through it"""
+
+    def __init__(self, file):
+        self.file = file
+        self.sha256 = hashlib.sha256()
+
+    def read(self, size=-1):
+        data = self.file.read(size)
+        self.sha256.update(data)
+        return data
+
+
+def _alembic_revision(connection):
+    try:
+        with connection.begin_nested():
+            return connection.execute(
+                text("SELECT version_num FROM alembic_version")
+            ).scalar()
+    except Exception:
+        return None
+
+
+def write_snapshot(connection, path):
+    """
+    COPY the reference tables to a snapshot at path, returning the manifest
+    """
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "revision": _alembic_revision(connection),
+        "tables": {},
+    }
+    cursor = connection.connection.cursor()
+    with tempfile.TemporaryDirectory() as directory:
+        for model in SNAPSHOT_MODELS:
+            table = model.__table__
+            columns = [column.name for column in table.c]
+            key = [column.name for column in table.primary_key]
+            filename = f"{table.name}.csv"
+            with open(os.path.join(directory, filename), "w+b") as file:
+                reader = HashingReader(file)
+                cursor.copy_expert(
+                    f"COPY (SELECT {', '.join(columns)} FROM {table.name} "
+                    f"ORDER BY {', '.join(key)}) TO STDOUT WITH (FORMAT csv, HEADER)",
+                    file,
+                )
+                rows = cursor.rowcount
+                file.seek(0)
+                while reader.read(1 << 20):
+                    pass
+            manifest["tables"][table.name] = {
+                "file": filename,
+                "columns": columns,
+                "key": key,
+                "rows": rows,
+                "sha256": reader.sha256.hexdigest(),
+            }
+
+        mtime = time.time()
+        partial = f"{path}.partial"
+        with tarfile.open(partial, "w:gz") as tar:
+            data = json.dumps(manifest, indent=2).encode()
+            info = tarfile.TarInfo("manifest.json")
+            info.size = len(data)
+            info.mtime = mtime
+            tar.addfile(info, io.BytesIO(data))
+            for details in manifest["tables"].values():
+                tar.add(os.path.join(directory, details["file"]), details["file"])
+        os.replace(partial, path)
+    return manifest
+
+
+def read_manifest(tar):
+    try:
+        manifest = json.load(tar.extractfile("manifest.json"))
+    except KeyError:
+        raise SnapshotError("Snapshot has no manifest.json")
+    if manifest.get("format") != SNAPSHOT_FORMAT:
+        raise SnapshotError(
+            f"Snapshot format {manifest.get('format')} is not supported, "
+            f"expected {SNAPSHOT_FORMAT}"
+        )
+    return manifest
+
+
+def load_snapshot(connection, path):
+    """
+    Merge a snapshot into the reference tables inside the connection's
+    current transaction, returning the number of rows per table. Rows in the
+    snapshot replace rows with the same key, other rows are left alone.
+    """
+    loaded = {}
+    cursor = connection.connection.cursor()
+    with tarfile.open(path, "r:gz") as tar:
+        manifest = read_manifest(tar)
+        for model in SNAPSHOT_MODELS:
+            table = model.__table__
+            details = manifest["tables"].get(table.name)
+            if details is None:
+                continue
+            unknown = set(details["columns"]) - {column.name for column in table.c}
+            if unknown:
+                raise SnapshotError(
+                    f"Snapshot {table.name} has columns not in the database: "
+                    f"{', '.join(sorted(unknown))}, migrate the database first"
+                )
+
+            columns = ", ".join(details["columns"])
+            staging = f"snapshot_{table.name}"
+            cursor.execute(
+                f"CREATE TEMPORARY TABLE {staging} "
+                f"(LIKE {table.name}) ON COMMIT DROP"
+            )
+            reader = HashingReader(tar.extractfile(details["file"]))
+            cursor.copy_expert(
+                f"COPY {staging} ({columns}) FROM STDIN WITH (FORMAT csv, HEADER)",
+                reader,
+            )
+            if reader.sha256.hexdigest() != details["sha256"]:
+                raise SnapshotError(f"Checksum mismatch for {details['file']}")
+
+            updates = ", ".join(
+                f"{column} = EXCLUDED.{column}"
+                for column in details["columns"]
+                if column not in details["key"]
+            )
+            cursor.execute(
+                f"INSERT INTO {table.name} ({columns}) "
+                f"SELECT {columns} FROM {staging} "
+                f"ON CONFLICT ({', '.join(details['key'])}) DO UPDATE SET {updates}"
+            )
+            loaded[table.name] = cursor.rowcount
+    return loaded
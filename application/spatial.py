@@ -0,0 +1,113 @@
+"""
+An in-memory spatial index of local plan boundaries.
+
+Each worker process holds its own STRtree of prepared boundary geometries so
+point lookups never need to scan geometries in the database. The index is
+built lazily on first use and rebuilt when boundaries change, either in this
+process (via mapper events) or in another worker (detected by a cheap
+signature query that does not read any geometry columns).
+"""
+
+import threading
+import time
+
+import numpy as np
+import shapely
+from shapely import STRtree
+from sqlalchemy import event, select, text
+
+from application.geometry import to_shape
+from application.models import LocalPlanBoundary
+
+SIGNATURE_SQL = text(
+    """
+    SELECT count(*),
+    md5(coalesce(string_agg(reference || ':' || xmin::text, ',' ORDER BY reference), ''))
+    FROM local_plan_boundary
+    """
+)
+
+
+class BoundarySnapshot:
+    def __init__(self, references, geometries, signature=None):
+        self.references = np.asarray(references, dtype=object)
+        self.geometries = np.asarray(geometries, dtype=object)
+        shapely.prepare(self.geometries)
+        self.tree = STRtree(self.geometries)
+        self.signature = signature
+
+    def __len__(self):
+        return len(self.references)
+
+    def query(self, long, lat):
+        point = shapely.Point(long, lat)
+        candidates = self.tree.query(point)
+        if len(candidates) == 0:
+            return []
+        hits = candidates[shapely.covers(self.geometries[candidates], point)]
+        return sorted(self.references[hits].tolist())
+
+
+def build_snapshot(rows, signature=None):
+    references = []
+    geometries = []
+    for reference, wkt, geojson, wkb in rows:
+        try:
+            geometry = to_shape(wkt, geojson, wkb)
+        except Exception as e:
+            print(f"Skipping boundary {reference} with unreadable geometry: {e}")
+            continue
+        if geometry is None or geometry.is_empty:
+            continue
+        references.append(reference)
+        geometries.append(geometry)
+    return BoundarySnapshot(references, geometries, signature=signature)
+
+
+class BoundaryIndex:
+    def __init__(self, check_interval=60):
+        self.check_interval = check_interval
+        self._snapshot = None
+        self._checked_at = 0
+        self._stale = True
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._stale = True
+
+    def boundaries_at(self, session, long, lat):
+        return self.get(session).query(long, lat)
+
+    def get(self, session):
+        snapshot = self._snapshot
+        if snapshot is not None and not self._stale:
+            if time.monotonic() - self._checked_at < self.check_interval:
+                return snapshot
+
+        with self._lock:
+            signature = tuple(session.execute(SIGNATURE_SQL).one())
+            self._checked_at = time.monotonic()
+            snapshot = self._snapshot
+            if snapshot is None or self._stale or snapshot.signature != signature:
+                self._stale = False
+                rows = session.execute(
+                    select(
+                        LocalPlanBoundary.reference,
+                        LocalPlanBoundary.geometry,
+                        LocalPlanBoundary.geojson,
+                        LocalPlanBoundary.geometry_wkb,
+                    )
+                )
+                snapshot = build_snapshot(rows, signature=signature)
+                self._snapshot = snapshot
+        return snapshot
+
+
+boundary_index = BoundaryIndex()
+
+
+@event.listens_for(LocalPlanBoundary, "after_insert")
+@event.listens_for(LocalPlanBoundary, "after_update")
+@event.listens_for(LocalPlanBoundary, "after_delete")
+def _invalidate_boundary_index(mapper, connection, target):
+    boundary_index.invalidate()
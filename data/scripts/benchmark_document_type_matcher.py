@@ -0,0 +1,48 @@
+"""
+Compare matching scraped link names to document types one at a time with
+thefuzz's process.extractOne against DocumentTypeMatcher, using the names in
+data/local-plan-document.csv as the link texts.
+
+    python data/scripts/benchmark_document_type_matcher.py
+"""
+
+import csv
+import sys
+import time
+from pathlib import Path
+
+from thefuzz import process
+
+root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(root))
+
+from application.scraping import DocumentTypeMatcher, clean_text  # noqa: E402
+
+
+def main():
+    with open(root / "data" / "local-plan-document-types.csv") as file:
+        types = {row["reference"]: row["name"] for row in csv.DictReader(file)}
+    with open(root / "data" / "local-plan-document.csv") as file:
+        names = [row["name"] for row in csv.DictReader(file)]
+
+    started = time.perf_counter()
+    expected = []
+    for name in names:
+        match = process.extractOne(clean_text(name), types)
+        expected.append(match[2] if match[1] > 85 else None)
+    extract_one = time.perf_counter() - started
+
+    started = time.perf_counter()
+    matcher = DocumentTypeMatcher(types, workers=-1)
+    matched = matcher.match_many([clean_text(name) for name in names])
+    vectorised = time.perf_counter() - started
+
+    differences = sum(a != b for a, b in zip(expected, matched))
+    print(f"{len(names)} link names against {len(types)} document types")
+    print(f"extractOne per name: {extract_one:.3f}s")
+    print(f"DocumentTypeMatcher: {vectorised:.3f}s ({extract_one / vectorised:.1f}x)")
+    print(f"matched {sum(m is not None for m in matched)}, differences {differences}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""make the document_organisation foreign key to local_plan_document deferrable
+
+Revision ID: e7b3c9d2f418
+Revises: a4d9e2b7c6f1
+Create Date: 2026-10-19 20:05:41.209337
+
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "e7b3c9d2f418"
+down_revision = "a4d9e2b7c6f1"
+branch_labels = None
+depends_on = None
+
+
+# older databases key documents on (reference, local_plan) and name the
+# constraint differently, so look it up rather than naming it
+SET_DEFERRABLE = """
+DO $$
+DECLARE
+    fkey text;
+BEGIN
+    FOR fkey IN
+        SELECT conname FROM pg_constraint
+        WHERE conrelid = 'document_organisation'::regclass
+        AND confrelid = 'local_plan_document'::regclass
+        AND contype = 'f'
+    LOOP
+        EXECUTE format(
+            'ALTER TABLE document_organisation ALTER CONSTRAINT %I {}', fkey
+        );
+    END LOOP;
+END $$;
+"""
+
+
+def upgrade():
+    # lets fix-duplicate-document-references rename a document and its
+    # organisation links in one transaction with SET CONSTRAINTS ... DEFERRED
+    op.execute(SET_DEFERRABLE.format("DEFERRABLE INITIALLY IMMEDIATE"))
+
+
+def downgrade():
+    op.execute(SET_DEFERRABLE.format("NOT DEFERRABLE"))
@@ -1,3 +1,6 @@
+import threading
+from http.server import ThreadingHTTPServer
+
 import pytest
 from slugify import slugify
 
@@ -80,3 +83,24 @@ def test_data(app, supporting_types):
         organisation.local_plans.append(local_plan)
         db.session.add(organisation)
         db.session.commit()
+
+
+@pytest.fixture
+def serve():
+    """
+    Start a local HTTP server for a request handler class and return its base
+    url, servers are shut down when the test finishes
+    """
+    servers = []
+
+    def start(handler):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_port}"
+
+    yield start
+
+    for server in servers:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,26 @@
+import pytest
+
+from application.extensions import db
+
+
+@pytest.fixture
+def run(app):
+    """Run a flask data command against the test database, returning the result"""
+    runner = app.test_cli_runner()
+
+    def invoke(*args):
+        result = runner.invoke(args=["data", *args])
+        if result.exception is not None and not isinstance(
+            result.exception, SystemExit
+        ):
+            raise result.exception
+        return result
+
+    return invoke
+
+
+@pytest.fixture
+def session(app):
+    with app.app_context():
+        yield db.session
+        db.session.rollback()
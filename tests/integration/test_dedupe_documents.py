@@ -0,0 +1,99 @@
+import datetime
+
+import pytest
+from sqlalchemy import delete, select
+
+from application.models import LocalPlan, LocalPlanDocument, Organisation
+
+PLAN = "dedupe-test-plan"
+PDF = "https://example.com/plan.pdf"
+ANNEX = "https://example.com/annex.pdf"
+
+
+@pytest.fixture
+def documents(session):
+    first = Organisation(organisation="dedupe-test:1", name="First")
+    second = Organisation(organisation="dedupe-test:2", name="Second")
+    session.add_all([first, second, LocalPlan(reference=PLAN, name="Plan")])
+    session.flush()
+    for reference, url, organisations, end_date in [
+        ("plan", PDF, [first], None),
+        ("plan-copy", PDF, [first], None),
+        ("plan-2", PDF, [first], None),
+        # a different set of organisations isn't a duplicate
+        ("plan-joint", PDF, [first, second], None),
+        ("annex", ANNEX, [first], None),
+        ("annex-old", ANNEX, [first], datetime.date(2020, 1, 1)),
+    ]:
+        session.add(
+            LocalPlanDocument(
+                reference=reference,
+                name=reference,
+                local_plan=PLAN,
+                document_url=url,
+                organisations=organisations,
+                end_date=end_date,
+            )
+        )
+    session.commit()
+
+    yield
+
+    session.rollback()
+    for document in session.scalars(
+        select(LocalPlanDocument).where(LocalPlanDocument.local_plan == PLAN)
+    ):
+        document.organisations.clear()
+    session.flush()
+    session.execute(
+        delete(LocalPlanDocument).where(LocalPlanDocument.local_plan == PLAN)
+    )
+    session.execute(delete(LocalPlan).where(LocalPlan.reference == PLAN))
+    session.execute(
+        delete(Organisation).where(Organisation.organisation.like("dedupe-test:%"))
+    )
+    session.commit()
+
+
+def end_dates(session):
+    session.expire_all()
+    return dict(
+        session.execute(
+            select(LocalPlanDocument.reference, LocalPlanDocument.end_date).where(
+                LocalPlanDocument.local_plan == PLAN
+            )
+        ).all()
+    )
+
+
+def test_duplicates_are_end_dated_keeping_the_shortest_reference(
+    documents, session, run
+):
+    result = run("dedupe-documents")
+
+    assert "Successfully set end date for 2 duplicate documents" in result.output
+    today = datetime.date.today()
+    assert end_dates(session) == {
+        "plan": None,
+        "plan-2": today,
+        "plan-copy": today,
+        "plan-joint": None,
+        "annex": None,
+        "annex-old": datetime.date(2020, 1, 1),
+    }
+
+
+def test_dry_run_reports_without_changing_anything(documents, session, run):
+    result = run("dedupe-documents", "--dry-run")
+
+    assert "Found 3 duplicates for document URL: https://example.com/plan.pdf" in (
+        result.output
+    )
+    assert "Keeping document with reference: plan\n" in result.output
+    assert "Would set end date for duplicate with reference: plan-2" in result.output
+    assert "Would set end date for duplicate with reference: plan-copy" in (
+        result.output
+    )
+    assert "Duplicate with reference annex-old already end dated" in result.output
+    assert "Would set end date for 2 duplicate documents" in result.output
+    assert end_dates(session)["plan-copy"] is None
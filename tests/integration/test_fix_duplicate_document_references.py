@@ -0,0 +1,138 @@
+import pytest
+from sqlalchemy import event, text
+
+from application.extensions import db
+
+# documents keyed on (reference, local_plan) as in databases from before the
+# reference became the primary key, the only ones that can hold duplicates
+LEGACY_TABLES = """
+    CREATE SCHEMA legacy;
+    CREATE TABLE legacy.local_plan_document (
+        reference text NOT NULL,
+        local_plan text NOT NULL,
+        PRIMARY KEY (reference, local_plan)
+    );
+    CREATE TABLE legacy.document_organisation (
+        local_plan_document_reference text NOT NULL,
+        local_plan_document_local_plan text NOT NULL,
+        organisation text NOT NULL,
+        CONSTRAINT document_organisation_local_plan_document_reference_local__fkey
+        FOREIGN KEY (local_plan_document_reference, local_plan_document_local_plan)
+        REFERENCES legacy.local_plan_document (reference, local_plan)
+        DEFERRABLE INITIALLY IMMEDIATE
+    );
+"""
+
+
+def _use_legacy_schema(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("SET search_path TO legacy, public")
+    cursor.close()
+    dbapi_connection.commit()
+
+
+@pytest.fixture
+def legacy(app):
+    with app.app_context():
+        db.session.execute(text(LEGACY_TABLES))
+        db.session.commit()
+        engine = db.engine
+    event.listen(engine, "connect", _use_legacy_schema)
+    engine.dispose()
+
+    yield engine
+
+    event.remove(engine, "connect", _use_legacy_schema)
+    engine.dispose()
+    with app.app_context():
+        db.session.execute(text("DROP SCHEMA legacy CASCADE"))
+        db.session.commit()
+
+
+def add(engine, documents, links=()):
+    with engine.begin() as connection:
+        for reference, local_plan in documents:
+            connection.execute(
+                text("INSERT INTO local_plan_document VALUES (:reference, :plan)"),
+                {"reference": reference, "plan": local_plan},
+            )
+        for reference, local_plan, organisation in links:
+            connection.execute(
+                text(
+                    "INSERT INTO document_organisation VALUES (:reference, :plan, :org)"
+                ),
+                {"reference": reference, "plan": local_plan, "org": organisation},
+            )
+
+
+def documents(engine):
+    with engine.connect() as connection:
+        return sorted(
+            connection.execute(
+                text("SELECT reference, local_plan FROM local_plan_document")
+            ).all()
+        )
+
+
+def links(engine):
+    with engine.connect() as connection:
+        return sorted(
+            connection.execute(text("SELECT * FROM document_organisation")).all()
+        )
+
+
+def test_duplicates_are_suffixed_with_their_plan(legacy, run):
+    add(
+        legacy,
+        [("plan", "a"), ("plan", "b"), ("plan-b", "c"), ("other", "a")],
+        [("plan", "a", "org:1"), ("plan", "b", "org:2")],
+    )
+
+    result = run("fix-duplicate-document-references")
+
+    assert "Found 1 references that have duplicates" in result.output
+    # plan-b is already taken so the second document gets the next suffix
+    assert documents(legacy) == [
+        ("other", "a"),
+        ("plan-a", "a"),
+        ("plan-b", "c"),
+        ("plan-b-2", "b"),
+    ]
+    assert links(legacy) == [("plan-a", "a", "org:1"), ("plan-b-2", "b", "org:2")]
+
+
+def test_nothing_changes_when_new_references_would_clash(legacy, run):
+    add(legacy, [("plan", "a"), ("plan", "b"), ("plan-b", "c"), ("plan-b-2", "d")])
+
+    result = run("fix-duplicate-document-references")
+
+    assert "clash with existing documents, nothing changed: plan-b-2" in result.output
+    assert documents(legacy) == [
+        ("plan", "a"),
+        ("plan", "b"),
+        ("plan-b", "c"),
+        ("plan-b-2", "d"),
+    ]
+
+
+def test_a_failed_update_rolls_back_documents_and_links(legacy, run):
+    add(legacy, [("plan", "a"), ("plan", "b")], [("plan", "a", "org:1")])
+    with legacy.begin() as connection:
+        connection.execute(
+            text(
+                "ALTER TABLE local_plan_document "
+                "ADD CONSTRAINT not_plan_b CHECK (reference <> 'plan-b')"
+            )
+        )
+
+    result = run("fix-duplicate-document-references")
+
+    assert "Error fixing duplicate document references" in result.output
+    assert documents(legacy) == [("plan", "a"), ("plan", "b")]
+    assert links(legacy) == [("plan", "a", "org:1")]
+
+
+def test_nothing_to_fix_in_the_current_schema(app, run):
+    result = run("fix-duplicate-document-references")
+
+    assert "No duplicate references to fix" in result.output
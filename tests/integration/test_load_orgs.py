@@ -0,0 +1,130 @@
+import json
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from sqlalchemy import delete, select
+
+from application.models import Organisation, ReferenceDataLoad
+
+
+def org(organisation, name, dataset="local-authority", end_date="", **fields):
+    return {
+        "organisation": organisation,
+        "name": name,
+        "dataset": dataset,
+        "end_date": end_date,
+        "entry_date": "2020-01-01",
+        "statistical_geography": "",
+        "website": "",
+        "local_authority_type": "NMD",
+        "official_name": "",
+        **fields,
+    }
+
+
+class StubDatasette(BaseHTTPRequestHandler):
+    """Serves organisations two to a page with datasette's Link: rel="next" """
+
+    organisations = []
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        page = int(parse_qs(url.query).get("_page", ["0"])[0])
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        if (page + 1) * 2 < len(self.organisations):
+            self.send_header(
+                "Link",
+                f"<http://{self.headers['Host']}{url.path}?_shape=array"
+                f'&_page={page + 1}>; rel="next"',
+            )
+        self.end_headers()
+        self.wfile.write(
+            json.dumps(self.organisations[page * 2 : page * 2 + 2]).encode()
+        )
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def datasette(app, serve, session, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, "DATASETTE_URL", serve(StubDatasette))
+    monkeypatch.setitem(app.config, "HTTP_CACHE_DIR", str(tmp_path))
+    session.add(
+        Organisation(
+            organisation="local-authority:TST1",
+            name="Old name",
+            website="https://old.example.com",
+        )
+    )
+    session.commit()
+    StubDatasette.organisations = [
+        org("local-authority:TST1", "Testshire", statistical_geography="E0TST1"),
+        org("local-authority:TST2", "Newshire"),
+        org("local-authority:TST3", "Gone", end_date="2019-01-01"),
+        org(
+            "government-organisation:TST4",
+            "Ministry",
+            dataset="government-organisation",
+        ),
+        org("", "No reference"),
+    ]
+
+    yield StubDatasette
+
+    session.rollback()
+    session.execute(
+        delete(Organisation).where(Organisation.organisation.like("%:TST%"))
+    )
+    session.execute(delete(ReferenceDataLoad))
+    session.commit()
+
+
+def test_load_orgs_upserts_current_local_authorities(datasette, session, run):
+    result = run("load-orgs")
+
+    assert "Organisations: 1 inserted, 1 updated, 3 skipped" in result.output
+    orgs = {
+        o.organisation: o
+        for o in session.scalars(
+            select(Organisation).where(Organisation.organisation.like("%:TST%"))
+        )
+    }
+    assert set(orgs) == {"local-authority:TST1", "local-authority:TST2"}
+    assert orgs["local-authority:TST1"].name == "Testshire"
+    assert orgs["local-authority:TST1"].statistical_geography == "E0TST1"
+    # blank strings upstream are stored as NULL
+    assert orgs["local-authority:TST1"].website is None
+    assert orgs["local-authority:TST2"].entry_date.isoformat() == "2020-01-01"
+
+
+def test_load_orgs_skips_unchanged_data_unless_refreshed(datasette, session, run):
+    run("load-orgs")
+    session.execute(
+        Organisation.__table__.update()
+        .where(Organisation.organisation == "local-authority:TST2")
+        .values(name="Edited")
+    )
+    session.commit()
+
+    unchanged = run("load-orgs")
+    assert "Organisations unchanged since" in unchanged.output
+    assert session.get(Organisation, "local-authority:TST2").name == "Edited"
+
+    refreshed = run("load-orgs", "--refresh")
+    assert "Organisations: 0 inserted, 2 updated, 3 skipped" in refreshed.output
+    session.expire_all()
+    assert session.get(Organisation, "local-authority:TST2").name == "Newshire"
+
+
+def test_load_orgs_loads_again_when_upstream_changes(datasette, session, run):
+    run("load-orgs")
+    datasette.organisations = datasette.organisations + [
+        org("local-authority:TST5", "Latershire")
+    ]
+
+    result = run("load-orgs")
+
+    assert "Organisations: 1 inserted, 2 updated, 3 skipped" in result.output
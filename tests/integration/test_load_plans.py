@@ -0,0 +1,90 @@
+import pytest
+from sqlalchemy import delete, func, select
+
+from application.models import LocalPlan, Organisation, local_plan_organisation
+
+HEADER = (
+    "reference,name,description,documentation-url,organisations,"
+    "period-start-date,period-end-date,adopted-date,\n"
+)
+
+
+@pytest.fixture
+def plans_csv(session, tmp_path):
+    session.add_all(
+        [
+            Organisation(organisation="local-authority:TSTA", name="A"),
+            Organisation(organisation="local-authority:TSTB", name="B"),
+            LocalPlan(
+                reference="load-plans-test-existing",
+                name="Old name",
+                period_start_date=2010,
+                period_end_date=2025,
+            ),
+        ]
+    )
+    session.commit()
+    path = tmp_path / "local-plan.csv"
+    path.write_text(
+        HEADER + "load-plans-test-existing,Existing Plan,,https://a.example.com,"
+        "local-authority:TSTA,2011,2030,,\n"
+        + "load-plans-test-joint,Joint Plan,A joint plan,,"
+        "local-authority:TSTA;local-authority:TSTB;local-authority:UNKNOWN,"
+        "2020,2040,,\n"
+    )
+
+    yield str(path)
+
+    session.rollback()
+    plans = LocalPlan.reference.like("load-plans-test-%")
+    session.execute(
+        delete(local_plan_organisation).where(
+            local_plan_organisation.c.local_plan.like("load-plans-test-%")
+        )
+    )
+    session.execute(delete(LocalPlan).where(plans))
+    session.execute(
+        delete(Organisation).where(Organisation.organisation.like("%:TST%"))
+    )
+    session.commit()
+
+
+def test_load_plans(plans_csv, session, run):
+    result = run("load-plans", "--file", plans_csv)
+
+    assert "Plans: 1 inserted, 1 updated, 3 organisation links" in result.output
+    existing = session.get(LocalPlan, "load-plans-test-existing")
+    assert existing.name == "Existing Plan"
+    assert existing.documentation_url == "https://a.example.com"
+    # existing plans keep their dates
+    assert (existing.period_start_date, existing.period_end_date) == (2010, 2025)
+    joint = session.get(LocalPlan, "load-plans-test-joint")
+    assert joint.description == "A joint plan"
+    assert joint.documentation_url is None
+    assert (joint.period_start_date, joint.period_end_date) == (2020, 2040)
+    assert joint.status is not None
+    links = session.execute(
+        select(local_plan_organisation).where(
+            local_plan_organisation.c.local_plan.like("load-plans-test-%")
+        )
+    ).all()
+    # organisations that aren't loaded are left out
+    assert sorted(links) == [
+        ("load-plans-test-existing", "local-authority:TSTA"),
+        ("load-plans-test-joint", "local-authority:TSTA"),
+        ("load-plans-test-joint", "local-authority:TSTB"),
+    ]
+
+
+def test_load_plans_again_adds_nothing(plans_csv, session, run):
+    run("load-plans", "--file", plans_csv)
+
+    result = run("load-plans", "--file", plans_csv)
+
+    assert "Plans: 0 inserted, 2 updated, 3 organisation links" in result.output
+    links = session.scalar(
+        select(func.count()).where(
+            local_plan_organisation.c.local_plan.like("load-plans-test-%")
+        )
+    )
+    assert links == 3
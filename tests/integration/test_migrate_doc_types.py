@@ -0,0 +1,80 @@
+import pytest
+from sqlalchemy import delete
+
+from application.models import LocalPlan, LocalPlanDocument, LocalPlanDocumentType
+
+TYPES = ["local-plan", "viability-assessment", "policies-map"]
+
+
+@pytest.fixture
+def documents(session):
+    created = [
+        LocalPlanDocumentType(reference=reference, name=reference)
+        for reference in TYPES
+        if session.get(LocalPlanDocumentType, reference) is None
+    ]
+    session.add_all(created)
+    session.add(LocalPlan(reference="doc-types-test-plan", name="Plan"))
+    session.commit()
+
+    def add(reference, document_types):
+        session.add(
+            LocalPlanDocument(
+                reference=f"doc-types-test-{reference}",
+                name=reference,
+                local_plan="doc-types-test-plan",
+                document_types=document_types,
+            )
+        )
+        session.commit()
+
+    yield add
+
+    session.rollback()
+    session.execute(
+        delete(LocalPlanDocument).where(
+            LocalPlanDocument.local_plan == "doc-types-test-plan"
+        )
+    )
+    session.execute(
+        delete(LocalPlan).where(LocalPlan.reference == "doc-types-test-plan")
+    )
+    session.execute(
+        delete(LocalPlanDocumentType).where(
+            LocalPlanDocumentType.reference.in_([t.reference for t in created])
+        )
+    )
+    session.commit()
+
+
+def document_types(session, reference):
+    session.expire_all()
+    return session.get(LocalPlanDocument, f"doc-types-test-{reference}").document_types
+
+
+@pytest.mark.parametrize("batch_size", ["1000", "1"])
+def test_document_types_are_normalised(documents, session, run, batch_size):
+    documents("plan", ["Local_Plan"])
+    documents("viability", ["financial_viability_study", "policies-map"])
+    documents("unknown", ["local-plan", "Made_Up"])
+    documents("all-unknown", ["made-up"])
+    documents("current", ["policies-map"])
+
+    result = run("migrate-doc-types", "--batch-size", batch_size)
+
+    assert "Updated document types for 3 documents" in result.output
+    assert "No matching document type found for:\n  made-up: 2 documents" in (
+        result.output
+    )
+    assert document_types(session, "plan") == ["local-plan"]
+    assert document_types(session, "viability") == [
+        "viability-assessment",
+        "policies-map",
+    ]
+    assert document_types(session, "unknown") == ["local-plan"]
+    # nothing is left to replace them with, so they are kept for review
+    assert document_types(session, "all-unknown") == ["made-up"]
+    assert document_types(session, "current") == ["policies-map"]
+
+    again = run("migrate-doc-types", "--batch-size", batch_size)
+    assert "Updated document types for 0 documents" in again.output
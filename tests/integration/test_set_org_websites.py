@@ -0,0 +1,94 @@
+import json
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from sqlalchemy import delete
+
+from application.models import Organisation, ReferenceDataLoad
+
+
+class StubDatasette(BaseHTTPRequestHandler):
+    organisations = [
+        {"organisation": "local-authority:TSTW1", "website": "https://new.example.com"},
+        {
+            "organisation": "local-authority:TSTW2",
+            "website": "https://same.example.com",
+        },
+        {"organisation": "local-authority:TSTW3", "website": ""},
+        {"organisation": "local-authority:NOT-LOADED", "website": "https://x.com"},
+    ]
+
+    def do_GET(self):
+        rows = self.organisations
+        if "website__notblank" in parse_qs(urlparse(self.path).query):
+            rows = [row for row in rows if row["website"]]
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(json.dumps(rows).encode())
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def organisations(app, serve, session, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, "DATASETTE_URL", serve(StubDatasette))
+    monkeypatch.setitem(app.config, "HTTP_CACHE_DIR", str(tmp_path))
+    session.add_all(
+        [
+            Organisation(
+                organisation="local-authority:TSTW1",
+                name="One",
+                website="https://old.example.com",
+            ),
+            Organisation(
+                organisation="local-authority:TSTW2",
+                name="Two",
+                website="https://same.example.com",
+            ),
+            Organisation(
+                organisation="local-authority:TSTW3",
+                name="Three",
+                website="https://kept.example.com",
+            ),
+        ]
+    )
+    session.commit()
+
+    yield
+
+    session.rollback()
+    session.execute(
+        delete(Organisation).where(Organisation.organisation.like("%:TSTW%"))
+    )
+    session.execute(delete(ReferenceDataLoad))
+    session.commit()
+
+
+def test_set_org_websites_updates_only_changed_websites(organisations, session, run):
+    result = run("set-org-websites")
+
+    assert "Fetched 3 organisation websites, updated 1 organisations" in result.output
+    websites = {
+        reference: session.get(Organisation, reference).website
+        for reference in ["local-authority:TSTW1", "local-authority:TSTW2"]
+    }
+    assert websites == {
+        "local-authority:TSTW1": "https://new.example.com",
+        "local-authority:TSTW2": "https://same.example.com",
+    }
+    # a blank website upstream doesn't clear the one we have
+    assert (
+        session.get(Organisation, "local-authority:TSTW3").website
+        == "https://kept.example.com"
+    )
+
+
+def test_set_org_websites_skips_unchanged_data(organisations, run):
+    run("set-org-websites")
+
+    result = run("set-org-websites")
+
+    assert "Organisation websites unchanged since" in result.output
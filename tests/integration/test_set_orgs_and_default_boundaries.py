@@ -0,0 +1,151 @@
+import pytest
+from sqlalchemy import delete, select, update
+
+from application.models import (
+    LocalPlan,
+    LocalPlanBoundary,
+    LocalPlanDocument,
+    Organisation,
+    Status,
+    boundary_organisation,
+    document_organisation,
+    local_plan_organisation,
+)
+
+SQUARE = "MULTIPOLYGON (((0 50, 1 50, 1 51, 0 51, 0 50)))"
+
+
+@pytest.fixture
+def plans(session):
+    first = Organisation(organisation="local-authority:TSTD1", name="First")
+    second = Organisation(organisation="local-authority:TSTD2", name="Second")
+    session.add_all([first, second])
+    session.add(
+        LocalPlan(
+            reference="set-orgs-test-plan",
+            name="Plan",
+            organisations=[first, second],
+        )
+    )
+    session.commit()
+
+    yield first, second
+
+    session.rollback()
+    plan = LocalPlan.reference.like("set-orgs-test-%")
+    boundary = LocalPlanBoundary.reference.like("E0TSTD%")
+    session.execute(update(LocalPlan).where(plan).values(local_plan_boundary=None))
+    session.execute(
+        delete(boundary_organisation).where(
+            boundary_organisation.c.local_plan_boundary.like("E0TSTD%")
+        )
+    )
+    session.execute(delete(LocalPlanBoundary).where(boundary))
+    session.execute(
+        delete(document_organisation).where(
+            document_organisation.c.local_plan_document_reference.like(
+                "set-orgs-test-%"
+            )
+        )
+    )
+    session.execute(
+        delete(LocalPlanDocument).where(
+            LocalPlanDocument.local_plan.like("set-orgs-test-%")
+        )
+    )
+    session.execute(
+        delete(local_plan_organisation).where(
+            local_plan_organisation.c.local_plan.like("set-orgs-test-%")
+        )
+    )
+    session.execute(delete(LocalPlan).where(plan))
+    session.execute(
+        delete(Organisation).where(Organisation.organisation.like("%:TSTD%"))
+    )
+    session.commit()
+
+
+def test_documents_without_organisations_take_their_plans(plans, session, run):
+    first, second = plans
+    session.add_all(
+        [
+            LocalPlanDocument(
+                reference="set-orgs-test-doc",
+                name="Doc",
+                local_plan="set-orgs-test-plan",
+            ),
+            LocalPlanDocument(
+                reference="set-orgs-test-doc-with-org",
+                name="Doc",
+                local_plan="set-orgs-test-plan",
+                organisations=[second],
+            ),
+        ]
+    )
+    session.commit()
+
+    run("set-orgs")
+
+    links = session.execute(
+        select(document_organisation).where(
+            document_organisation.c.local_plan_document_reference.like(
+                "set-orgs-test-%"
+            )
+        )
+    ).all()
+    assert sorted(links) == [
+        ("set-orgs-test-doc", "local-authority:TSTD1"),
+        ("set-orgs-test-doc", "local-authority:TSTD2"),
+        ("set-orgs-test-doc-with-org", "local-authority:TSTD2"),
+    ]
+
+
+@pytest.mark.parametrize("compact", [False, True], ids=["text", "compact"])
+def test_default_boundaries(app, plans, session, run, monkeypatch, compact):
+    monkeypatch.setitem(app.config, "COMPACT_GEOMETRY_STORAGE", compact)
+    first, second = plans
+    # both organisations share a geography, the first one's geometry is used
+    for org in plans:
+        org.statistical_geography = "E0TSTD1"
+        org.geometry = SQUARE
+    session.add_all(
+        [
+            Organisation(
+                organisation="local-authority:TSTD3",
+                name="No geometry",
+                statistical_geography="E0TSTD3",
+            ),
+            LocalPlan(
+                reference="set-orgs-test-has-boundary",
+                name="Plan",
+                organisations=[first],
+                boundary=LocalPlanBoundary(reference="E0TSTD9", name="Own"),
+            ),
+        ]
+    )
+    session.commit()
+
+    result = run("default-boundaries")
+
+    assert "1 boundaries created, 1 plans updated" in result.output
+    session.expire_all()
+    boundary = session.get(LocalPlanBoundary, "E0TSTD1")
+    assert boundary.name == "First"
+    assert boundary.description == "Default local plan boundary"
+    assert boundary.shape.equals(first.shape)
+    assert (boundary.geometry_wkb is not None) == compact
+    assert session.get(LocalPlanBoundary, "E0TSTD3") is None
+    assert session.execute(
+        select(boundary_organisation).where(
+            boundary_organisation.c.local_plan_boundary == "E0TSTD1"
+        )
+    ).all() == [("E0TSTD1", "local-authority:TSTD1")]
+    plan = session.get(LocalPlan, "set-orgs-test-plan")
+    assert plan.local_plan_boundary == "E0TSTD1"
+    assert plan.boundary_status == Status.FOR_REVIEW
+    # plans with a boundary keep it
+    own = session.get(LocalPlan, "set-orgs-test-has-boundary")
+    assert own.local_plan_boundary == "E0TSTD9"
+
+    again = run("default-boundaries")
+    assert "0 boundaries created, 0 plans updated" in again.output
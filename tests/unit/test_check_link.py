@@ -0,0 +1,98 @@
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+from application.fetch import make_session
+from application.scraping import check_link
+
+
+class StubFiles(BaseHTTPRequestHandler):
+    def do_HEAD(self):
+        if self.path == "/drops-head.pdf":
+            # close the connection without answering
+            self.close_connection = True
+        elif self.path == "/busy.pdf":
+            self.send_error(503)
+        elif self.path == "/no-head.pdf":
+            self.send_error(405)
+        elif self.path == "/moved.pdf":
+            self.send_response(301)
+            self.send_header("Location", "/plan.pdf")
+            self.end_headers()
+        elif self.path == "/plan.pdf":
+            self.send_response(200)
+            self.send_header("Content-Type", "application/pdf")
+            self.send_header("Content-Length", "12345")
+            self.end_headers()
+        else:
+            self.send_error(404)
+
+    def do_GET(self):
+        if self.path == "/busy.pdf":
+            self.send_error(503)
+        elif (
+            self.path in ("/no-head.pdf", "/drops-head.pdf")
+            and self.headers.get("Range") == "bytes=0-0"
+        ):
+            self.send_response(206)
+            self.send_header("Content-Type", "application/pdf")
+            self.send_header("Content-Range", "bytes 0-0/54321")
+            self.send_header("Content-Length", "1")
+            self.end_headers()
+            self.wfile.write(b"%")
+        else:
+            self.send_error(404)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def files(serve):
+    return serve(StubFiles)
+
+
+def test_check_link_follows_redirects(files):
+    with make_session(retries=0) as session:
+        result = check_link(session, f"{files}/moved.pdf")
+
+    assert result["status"] == 200
+    assert result["final_url"] == f"{files}/plan.pdf"
+    assert result["content_type"] == "application/pdf"
+    assert result["content_length"] == 12345
+    assert result["checked_date"] is not None
+
+
+def test_check_link_falls_back_to_a_ranged_get(files):
+    with make_session(retries=0) as session:
+        result = check_link(session, f"{files}/no-head.pdf")
+
+    assert result["status"] == 206
+    assert result["content_length"] == 54321
+
+
+def test_check_link_reports_dead_and_unreachable_links(files):
+    with make_session(retries=0) as session:
+        dead = check_link(session, f"{files}/gone.pdf")
+        unreachable = check_link(session, "http://127.0.0.1:1/plan.pdf")
+
+    assert dead["status"] == 404
+    assert dead["error"] is None
+    assert unreachable["status"] is None
+    assert unreachable["error"]
+
+
+def test_check_link_records_server_errors_after_retrying(files):
+    with make_session(retries=1, backoff_factor=0, raise_on_status=False) as session:
+        result = check_link(session, f"{files}/busy.pdf")
+
+    assert result["status"] == 503
+    assert result["error"] is None
+
+
+def test_check_link_falls_back_to_a_ranged_get_when_head_fails(files):
+    with make_session(retries=0) as session:
+        result = check_link(session, f"{files}/drops-head.pdf")
+
+    assert result["status"] == 206
+    assert result["content_length"] == 54321
@@ -0,0 +1,52 @@
+import csv
+import io
+
+from application.commands import DOCUMENT_COPY_COLUMNS, CSVStream, importable_documents
+
+rows = [
+    {
+        "reference": "doc-1",
+        "local-plan": "plan-a",
+        "name": "Local plan",
+        "document-url": "https://example.com/a.pdf",
+        "documentation-url": "https://example.com/",
+        "document-types": "local-plan",
+    },
+    {
+        "reference": "doc-2",
+        "local-plan": "missing-plan",
+        "name": "Other",
+        "document-url": "https://example.com/b.pdf",
+        "documentation-url": "https://example.com/",
+        "document-types": "policies-map",
+    },
+]
+
+
+def test_importable_documents_skips_unknown_plans():
+    documents = list(importable_documents(iter(rows), {"plan-a"}))
+
+    assert [d["reference"] for d in documents] == ["doc-1"]
+    assert documents[0]["local_plan"] == "plan-a"
+    assert documents[0]["document_types"] == "{LOCAL_PLAN}"
+    assert documents[0]["status"] == "FOR_REVIEW"
+
+
+def test_csv_stream_reads_in_small_chunks():
+    documents = [
+        {**d, "reference": f"doc-{i}"}
+        for i, d in enumerate(
+            importable_documents(rows * 50, {"plan-a", "missing-plan"})
+        )
+    ]
+    stream = CSVStream(documents, DOCUMENT_COPY_COLUMNS)
+
+    chunks = []
+    while chunk := stream.read(64):
+        assert len(chunk) <= 64
+        chunks.append(chunk)
+
+    read = list(csv.DictReader(io.StringIO("".join(chunks)), DOCUMENT_COPY_COLUMNS))
+    assert stream.count == 100
+    assert [r["reference"] for r in read] == [d["reference"] for d in documents]
+    assert read[0]["end_date"] == ""
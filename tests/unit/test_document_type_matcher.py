@@ -0,0 +1,37 @@
+import csv
+from pathlib import Path
+
+import pytest
+from thefuzz import process
+
+from application.scraping import DocumentTypeMatcher, clean_text
+
+data = Path(__file__).parent.parent.parent / "data"
+
+
+def extract_one(name, reference_data):
+    match = process.extractOne(name, reference_data)
+    return match[0] if match[1] > 85 else None
+
+
+@pytest.mark.parametrize("workers", [1, -1])
+def test_matcher_agrees_with_extract_one(workers):
+    with open(data / "local-plan-document-types.csv") as file:
+        types = [row["name"] for row in csv.DictReader(file)]
+    with open(data / "local-plan-document.csv") as file:
+        names = [clean_text(row["name"]) for row in csv.DictReader(file)][:500]
+    names += ["", "   ", "Local Plan [PDF] (63KB)", "Policies Map", "Ãdopted plan"]
+
+    matched = DocumentTypeMatcher(types, workers=workers).match_many(names)
+
+    assert matched == [extract_one(name, types) for name in names]
+    assert any(matched)
+
+
+def test_matcher_returns_references_for_a_dict():
+    matcher = DocumentTypeMatcher({"local-plan": "Local plan", "policies-map": "Map"})
+
+    assert matcher.match("Local Plan") == "local-plan"
+    assert matcher.match("Bin collection days") is None
+    assert matcher.match_many([]) == []
+    assert DocumentTypeMatcher({}).match("Local plan") is None
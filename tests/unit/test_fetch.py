@@ -0,0 +1,54 @@
+import json
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+from application.fetch import HTTPCache, make_session
+
+
+class StubDataset(BaseHTTPRequestHandler):
+    body = None
+    etag = None
+    conditional_requests = 0
+
+    def do_GET(self):
+        if self.headers.get("If-None-Match") == self.etag:
+            StubDataset.conditional_requests += 1
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", self.etag)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def dataset_url(serve):
+    # tests change the response at class level, so start each from version one
+    StubDataset.body = json.dumps({"records": [{"reference": "a"}]}).encode()
+    StubDataset.etag = '"v1"'
+    StubDataset.conditional_requests = 0
+    return f"{serve(StubDataset)}/dataset.json"
+
+
+def test_cache_revalidates_with_etag(dataset_url, tmp_path):
+    cache = HTTPCache(tmp_path)
+    with make_session(retries=0) as session:
+        first = cache.get(session, dataset_url)
+        second = cache.get(session, dataset_url)
+
+        assert second.sha256 == first.sha256
+        assert second.json() == first.json() == {"records": [{"reference": "a"}]}
+        assert StubDataset.conditional_requests == 1
+
+        StubDataset.body = json.dumps({"records": [{"reference": "b"}]}).encode()
+        StubDataset.etag = '"v2"'
+        third = cache.get(session, dataset_url)
+
+    assert third.sha256 != first.sha256
+    assert third.json() == {"records": [{"reference": "b"}]}
@@ -0,0 +1,45 @@
+import hashlib
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+import requests
+
+from application.fetch import make_session
+from application.scraping import CHUNK_SIZE, fingerprint
+
+PDF = b"%PDF-1.7\n" + bytes(range(256)) * (3 * CHUNK_SIZE // 256)
+
+
+class StubFiles(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path not in ("/plan.pdf", "/copy-of-plan.pdf"):
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/pdf")
+        self.send_header("Content-Length", str(len(PDF)))
+        self.end_headers()
+        self.wfile.write(PDF)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def files(serve):
+    return serve(StubFiles)
+
+
+def test_fingerprint_hashes_the_whole_file(files):
+    with make_session(retries=0) as session:
+        original = fingerprint(session, f"{files}/plan.pdf")
+        copy = fingerprint(session, f"{files}/copy-of-plan.pdf")
+
+    assert original == (hashlib.sha256(PDF).hexdigest(), len(PDF))
+    assert copy == original
+
+
+def test_fingerprint_raises_for_missing_files(files):
+    with make_session(retries=0) as session:
+        with pytest.raises(requests.HTTPError):
+            fingerprint(session, f"{files}/gone.pdf")
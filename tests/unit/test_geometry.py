@@ -0,0 +1,85 @@
+import shapely
+from shapely import from_wkt
+from shapely.geometry import shape
+
+from application.geometry import repair_geometry
+
+bowtie = "POLYGON ((0 0, 10 10, 10 0, 0 10, 0 0))"
+
+
+def test_valid_geometry_is_left_alone():
+    square = "MULTIPOLYGON (((0 0, 1 0, 1 1, 0 1, 0 0)))"
+    assert repair_geometry(("a", square, None, None)) == ("a", [], None, None)
+
+
+def test_self_intersecting_wkt_and_geojson_are_repaired():
+    geojson = {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "properties": {"name": "bowtie"},
+                "geometry": {
+                    "type": "Polygon",
+                    "coordinates": [[[0, 0], [10, 10], [10, 0], [0, 10], [0, 0]]],
+                },
+            }
+        ],
+    }
+    key, problems, wkt, repaired_geojson = repair_geometry(("b", bowtie, geojson, None))
+
+    assert key == "b"
+    assert len(problems) == 2
+    repaired = from_wkt(wkt)
+    assert repaired.geom_type == "MultiPolygon"
+    assert repaired.is_valid
+    assert repaired.area == 50
+    feature = repaired_geojson["features"][0]
+    assert feature["properties"] == {"name": "bowtie"}
+    assert feature["geometry"]["type"] == "MultiPolygon"
+
+
+def test_unreadable_geometry_is_reported():
+    key, problems, wkt, geojson = repair_geometry(("c", "NOT WKT", None, None))
+
+    assert problems[0].startswith("unreadable")
+    assert wkt is None and geojson is None
+
+
+def test_compact_wkb_is_checked_and_repaired_to_wkt():
+    wkb = shapely.to_wkb(from_wkt(bowtie))
+
+    key, problems, wkt, geojson = repair_geometry(("d", None, None, wkb))
+
+    assert problems[0].startswith("wkb:")
+    assert from_wkt(wkt).is_valid
+    assert geojson is None
+
+
+def test_valid_wkt_is_kept_when_only_the_geojson_is_repaired():
+    square = "MULTIPOLYGON (((0 0, 1 0, 1 1, 0 1, 0 0)))"
+    geojson = {
+        "type": "Polygon",
+        "coordinates": [[[0, 0], [10, 10], [10, 0], [0, 10], [0, 0]]],
+    }
+
+    key, problems, wkt, repaired_geojson = repair_geometry(("e", square, geojson, None))
+
+    assert [p.split(":")[0] for p in problems] == ["geojson"]
+    assert wkt == square
+    assert shape(repaired_geojson).is_valid
+
+
+def test_geometry_with_no_area_is_unrepairable():
+    line = "POLYGON ((0 0, 1 1, 2 2, 0 0))"
+    geojson = {"type": "Polygon", "coordinates": [[[0, 0], [1, 1], [2, 2], [0, 0]]]}
+
+    for record in [
+        ("f", line, None, None),
+        ("g", None, geojson, None),
+        ("h", None, None, shapely.to_wkb(from_wkt(line))),
+    ]:
+        key, problems, wkt, repaired_geojson = repair_geometry(record)
+
+        assert "no polygon left after repair" in problems[-1]
+        assert wkt is None and repaired_geojson is None
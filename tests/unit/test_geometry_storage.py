@@ -0,0 +1,94 @@
+import pytest
+from flask import Flask
+from shapely import from_wkb, from_wkt
+
+from application.models import LocalPlanBoundary
+
+WKT = (
+    "MULTIPOLYGON (((0.1234567 51.1234567, 0.2 51.1, 0.2 51.2, 0.1234567 51.1234567)))"
+)
+QUANTIZED_WKT = "MULTIPOLYGON (((0.1235 51.1235, 0.2 51.1, 0.2 51.2, 0.1235 51.1235)))"
+GEOJSON_AS_WKT = "MULTIPOLYGON (((0.1 51.1, 0.2 51.1, 0.2 51.2, 0.1 51.1)))"
+GEOJSON = {
+    "type": "FeatureCollection",
+    "features": [
+        {
+            "type": "Feature",
+            "geometry": {
+                "type": "MultiPolygon",
+                "coordinates": [[[[0.1, 51.1], [0.2, 51.1], [0.2, 51.2], [0.1, 51.1]]]],
+            },
+            "properties": {},
+        }
+    ],
+}
+
+
+@pytest.fixture(params=[False, True], ids=["text", "compact"])
+def compact(request):
+    app = Flask(__name__)
+    app.config["COMPACT_GEOMETRY_STORAGE"] = request.param
+    app.config["GEOMETRY_PRECISION"] = 4
+    with app.app_context():
+        yield request.param
+
+
+def test_geometry_round_trips(compact):
+    boundary = LocalPlanBoundary()
+    assert not boundary.has_geometry
+
+    boundary.geometry = WKT
+    boundary.geojson = GEOJSON
+
+    assert boundary.has_geometry
+    if compact:
+        assert boundary._geometry is None
+        assert boundary._geojson is None
+        assert boundary.geometry_wkb is not None
+        assert from_wkt(boundary.geometry).equals(from_wkt(GEOJSON_AS_WKT))
+        assert boundary.geojson["type"] == "FeatureCollection"
+        assert boundary.shape.equals(from_wkt(GEOJSON_AS_WKT))
+    else:
+        assert boundary.geometry_wkb is None
+        assert boundary.geometry == WKT
+        assert boundary.geojson == GEOJSON
+
+
+def test_compact_storage_quantizes_coordinates(compact):
+    boundary = LocalPlanBoundary()
+    boundary.geometry = WKT
+
+    if compact:
+        assert from_wkb(boundary.geometry_wkb).equals(from_wkt(QUANTIZED_WKT))
+        assert from_wkt(boundary.geometry).equals(from_wkt(QUANTIZED_WKT))
+    else:
+        assert boundary.geometry == WKT
+
+
+def test_setting_none_keeps_the_stored_geometry(compact):
+    boundary = LocalPlanBoundary()
+    boundary.geometry = WKT
+    boundary.geojson = None
+
+    assert boundary.has_geometry
+    assert boundary.geometry is not None
+
+
+def test_geometry_values(compact):
+    values = LocalPlanBoundary.geometry_values(WKT, GEOJSON)
+
+    assert set(values) == {"_geometry", "_geojson", "geometry_wkb"}
+    if compact:
+        assert values["_geometry"] is None
+        assert values["_geojson"] is None
+        assert from_wkb(values["geometry_wkb"]).equals(from_wkt(QUANTIZED_WKT))
+    else:
+        assert values == {"_geometry": WKT, "_geojson": GEOJSON, "geometry_wkb": None}
+
+
+def test_geometry_values_without_a_geometry(compact):
+    assert LocalPlanBoundary.geometry_values() == {
+        "_geometry": None,
+        "_geojson": None,
+        "geometry_wkb": None,
+    }
@@ -0,0 +1,69 @@
+import json
+from http.server import BaseHTTPRequestHandler
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from application.commands import fetch_geographies
+from application.fetch import make_session
+
+test_data = Path(__file__).parent.parent / "test_data"
+
+ENTITIES = {"statistical-geography:E07000223": 1001}
+
+
+class StubPlanningData(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        self.requests.append(url.path)
+        if url.path == "/entity.json":
+            curie = parse_qs(url.query)["curie"][0]
+            entities = []
+            if curie in ENTITIES:
+                entities.append(
+                    {
+                        "entity": ENTITIES[curie],
+                        "geometry": (test_data / "adur.wkt").read_text(),
+                        "point": "POINT (-0.3 50.8)",
+                    }
+                )
+            self._send(json.dumps({"entities": entities}))
+        elif url.path == "/entity/1001.geojson":
+            self._send((test_data / "adur.geojson").read_text())
+        else:
+            self.send_error(404)
+
+    def _send(self, body):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def planning_data(serve):
+    StubPlanningData.requests = []
+    return serve(StubPlanningData)
+
+
+def test_fetch_geographies(planning_data):
+    orgs = [
+        ("local-authority:ADU", "E07000223"),
+        ("local-authority:XXX", "E99999999"),
+        ("local-authority:NONE", None),
+    ]
+    with make_session(pool_size=4, retries=0) as session:
+        geographies = fetch_geographies(orgs, session, planning_data, workers=4)
+
+    assert list(geographies) == ["local-authority:ADU"]
+    adur = geographies["local-authority:ADU"]
+    assert adur["point"] == "POINT (-0.3 50.8)"
+    assert adur["geometry"].startswith("MULTIPOLYGON")
+    assert adur["geojson"]["type"] == "FeatureCollection"
+    assert "/entity/1001.geojson" in StubPlanningData.requests
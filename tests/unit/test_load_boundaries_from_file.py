@@ -0,0 +1,68 @@
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+from application.commands import iter_geography_file, iter_geojson_features
+from application.utils import get_centre_and_bounds
+
+test_data = Path(__file__).parent.parent / "test_data"
+
+
+@pytest.mark.parametrize(
+    "filename",
+    ["local-authority-district.geojson", "local-authority-district.csv"],
+)
+def test_iter_geography_file(filename):
+    geographies = list(iter_geography_file(str(test_data / filename)))
+
+    assert [g["reference"] for g in geographies] == ["E07000223", "E07000224"]
+    adur = geographies[0]
+    assert adur["geometry"].startswith("MULTIPOLYGON")
+    assert adur["geojson"]["type"] == "FeatureCollection"
+    [feature] = adur["geojson"]["features"]
+    assert feature["geometry"]["type"] == "MultiPolygon"
+    # the map on the plan page reads boundaries with this
+    assert get_centre_and_bounds(adur["geojson"])[0] is not None
+    assert adur["point"] == "POINT (-0.3 50.85)"
+
+
+def test_iter_geojson_features_reads_in_small_chunks():
+    collection = json.loads((test_data / "adur.geojson").read_text())
+    text = json.dumps({**collection, "features": collection["features"] * 3})
+
+    features = list(iter_geojson_features(io.StringIO(text), chunk_size=4096))
+
+    assert features == collection["features"] * 3
+
+
+def test_iter_geojson_features_with_no_features():
+    text = '{"type": "FeatureCollection", "features": []}'
+    assert list(iter_geojson_features(io.StringIO(text))) == []
+
+
+class CountingReader(io.StringIO):
+    reads = 0
+
+    def read(self, size=-1):
+        self.reads += 1
+        return super().read(size)
+
+
+def test_iter_geojson_features_grows_reads_for_large_features():
+    ring = [[i / 1000, 50 + i / 1000] for i in range(20000)] + [[0, 50]]
+    feature = {
+        "type": "Feature",
+        "geometry": {"type": "Polygon", "coordinates": [ring]},
+        "properties": {"reference": "E07000223"},
+    }
+    text = json.dumps({"type": "FeatureCollection", "features": [feature, feature]})
+    file = CountingReader(text)
+
+    features = list(iter_geojson_features(file, chunk_size=4096))
+
+    assert features == [feature, feature]
+    # far fewer reads than the file has chunks, each failed decode doubles the buffer
+    assert len(text) // 4096 > 100
+    assert file.reads < 20
@@ -0,0 +1,105 @@
+import json
+
+import click
+from click.testing import CliRunner
+from flask import Flask
+from sqlalchemy import event, text
+
+from application.extensions import db
+from application.metrics import (
+    _count_statement,
+    instrument,
+    phase,
+    record_http,
+    verbose,
+)
+
+
+@click.command("count")
+@click.option("--rows", type=int, default=3)
+@instrument
+def count(rows):
+    with phase("fetch") as fetch:
+        record_http(100)
+        fetch.rows = rows
+    verbose("row detail")
+    return rows
+
+
+@click.command("outer")
+@click.pass_context
+@instrument
+def outer(ctx):
+    return ctx.invoke(count, rows=5)
+
+
+def test_metrics_json():
+    result = CliRunner().invoke(count, ["--metrics-json", "-"])
+
+    metrics = json.loads(result.output)
+    assert metrics["command"] == "count"
+    assert metrics["rows"] == 3
+    assert metrics["phases"][0]["name"] == "fetch"
+    assert metrics["phases"][0]["rows"] == 3
+    assert metrics["phases"][0]["http_requests"] == 1
+    assert metrics["phases"][0]["http_bytes"] == 100
+    # ru_maxrss is the process high water mark, never a per phase figure
+    assert (
+        metrics["phases"][0]["process_peak_rss_bytes"]
+        <= metrics["process_peak_rss_bytes"]
+    )
+
+
+def test_verbose_and_summary():
+    quiet = CliRunner().invoke(count, [])
+    loud = CliRunner().invoke(count, ["--verbose"])
+
+    assert "row detail" not in quiet.output
+    assert "row detail" in loud.output
+    assert "  fetch" in quiet.output
+    assert "proc peak MB" in quiet.output
+
+
+def test_nested_command_metrics_are_reported_by_the_outer_command():
+    result = CliRunner().invoke(outer, ["--metrics-json", "-"])
+
+    metrics = json.loads(result.output)
+    assert metrics["rows"] == 5
+    assert [c["command"] for c in metrics["commands"]] == ["count"]
+    assert metrics["commands"][0]["rows"] == 5
+
+
+@click.command("fail")
+@instrument
+def fail():
+    with phase("fetch"):
+        record_http(100)
+    raise click.ClickException("could not fetch")
+
+
+def test_failed_command_reports_metrics_and_exits_non_zero():
+    result = CliRunner().invoke(fail, [])
+
+    assert result.exit_code == 1
+    assert "could not fetch" in result.output
+    assert "  fetch" in result.output
+
+
+def test_sql_is_counted_on_the_app_engine_only_while_a_command_runs():
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    db.init_app(app)
+
+    @click.command("query")
+    @instrument
+    def query():
+        with phase("select") as select:
+            db.session.execute(text("select 1"))
+            select.rows = 1
+
+    with app.app_context():
+        result = CliRunner().invoke(query, ["--metrics-json", "-"])
+        listening = event.contains(db.engine, "before_cursor_execute", _count_statement)
+
+    assert json.loads(result.output)["phases"][0]["sql_statements"] == 1
+    assert not listening
@@ -0,0 +1,221 @@
+import hashlib
+import time
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import urljoin
+
+import pytest
+import requests
+from bs4 import BeautifulSoup
+
+from application.fetch import make_session
+from application.scraping import (
+    DocumentTypeMatcher,
+    HostLimiter,
+    PageCache,
+    crawl_plan,
+    fetch_links,
+    page_encoding,
+    parse_links,
+    split_links,
+)
+
+PAGES = {
+    "/local-plan": """
+        <a href="/files/local-plan.pdf">Local Plan [PDF] (63KB)</a>
+        <a href="/local-plan/evidence">Evidence base</a>
+        <a href="/bins">Bin collections</a>
+        <a href="https://elsewhere.example/local-plan">Another council</a>
+    """,
+    "/local-plan/evidence": """
+        <a href="/files/local-plan.pdf">Local Plan again</a>
+        <a href="/files/sa.pdf">Sustainability Appraisal</a>
+        <a href="/local-plan/evidence/more">Not followed, one level only</a>
+    """,
+    "/huge": '<meta charset="windows-1252"><a href="/first.pdf">Caf\xe9 plan</a>'
+    + " " * 100_000
+    + '<a href="/last.pdf">Past the cap</a>',
+}
+
+
+class StubCouncil(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        self.requests.append(self.path)
+        if self.path not in PAGES:
+            self.send_error(404)
+            return
+        etag = f'"{len(PAGES[self.path])}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(PAGES[self.path].encode("windows-1252"))
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def council(serve):
+    StubCouncil.requests = []
+    return serve(StubCouncil)
+
+
+def test_split_links():
+    documents, pages = split_links(
+        PAGES["/local-plan"], "https://council.example/local-plan"
+    )
+
+    assert documents == [("Local Plan", "https://council.example/files/local-plan.pdf")]
+    assert pages == ["https://council.example/local-plan/evidence"]
+
+
+@pytest.mark.parametrize(
+    "html",
+    [
+        '<a href="/a.pdf">Local <b>Plan</b> [PDF]</a>',
+        "<p><a href=x>closed by the paragraph</p> not link text</a>",
+        "<a href=1>outer<a href=2>inner</a>tail</a>",
+        "<a href=1><script>var a = 1</script><style>a {}</style>Name</a>",
+        "<template><a href=t>hidden</a></template>",
+        '<a href="a&amp;b">A &amp; B &pound;</a>',
+        '<A HREF="/X.PDF">Caps</A><a href>empty</a><a>no href</a>',
+        "<a href=1> a <!-- comment --> b </a><a href=2>one<br>two</a>",
+        "<div><a href=1>unclosed",
+    ],
+)
+def test_parse_links_matches_beautifulsoup(html):
+    url = "https://council.example/page"
+    soup = BeautifulSoup(html, "html.parser")
+    expected = [
+        (link.get_text(strip=True), link["href"], urljoin(url, link["href"]))
+        for link in soup.find_all("a", href=True)
+    ]
+
+    assert list(parse_links(html, url)) == expected
+    # text and tags split across chunks
+    chunks = [html[i : i + 3] for i in range(0, len(html), 3)]
+    assert list(parse_links(chunks, url)) == expected
+
+
+def test_fetch_links_stops_reading_at_max_bytes(council):
+    with make_session(retries=0) as session:
+        documents, _ = fetch_links(session, f"{council}/huge", max_bytes=10_000)
+
+    assert documents == [["Caf plan", f"{council}/first.pdf"]]
+
+
+@pytest.mark.parametrize(
+    "content_type, head, encoding",
+    [
+        ("text/html; charset=ISO-8859-1", b"<meta charset=utf-8>", "iso8859-1"),
+        ("text/html", b'<meta charset="windows-1252">', "cp1252"),
+        ("text/html", b"<meta charset=nonsense>", "utf-8"),
+        ("text/html", b"<html>", "utf-8"),
+    ],
+)
+def test_page_encoding(content_type, head, encoding):
+    response = requests.Response()
+    response.headers["Content-Type"] = content_type
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+
+    assert page_encoding(response, head) == encoding
+
+
+def test_crawl_plan_follows_one_level(council):
+    matcher = DocumentTypeMatcher(
+        {"local-plan": "Local plan", "sustainability-appraisal": "SA"}
+    )
+    with make_session(retries=0) as session:
+        candidates, errors = crawl_plan(
+            session,
+            HostLimiter(delay=0),
+            "plan-a",
+            f"{council}/local-plan",
+            matcher,
+        )
+
+    assert errors == []
+    assert sorted(StubCouncil.requests) == ["/local-plan", "/local-plan/evidence"]
+    by_url = {c["document_url"]: c for c in candidates}
+    assert set(by_url) == {
+        f"{council}/files/local-plan.pdf",
+        f"{council}/files/sa.pdf",
+    }
+    assert by_url[f"{council}/files/local-plan.pdf"]["document_type"] == "local-plan"
+    assert by_url[f"{council}/files/local-plan.pdf"]["documentation_url"] == (
+        f"{council}/local-plan"
+    )
+    assert by_url[f"{council}/files/sa.pdf"]["document_type"] is None
+
+
+def test_crawl_plan_reports_errors(council):
+    with make_session(retries=0) as session:
+        candidates, errors = crawl_plan(
+            session,
+            HostLimiter(delay=0),
+            "plan-a",
+            f"{council}/missing",
+            DocumentTypeMatcher({}),
+        )
+
+    assert candidates == []
+    assert len(errors) == 1
+
+
+def test_fetch_links_revalidates_cached_pages(council):
+    url = f"{council}/local-plan"
+    cache = PageCache()
+    with make_session(retries=0) as session:
+        fetched = fetch_links(session, url, cache)
+        revalidated = fetch_links(session, url, cache)
+
+    assert fetched == revalidated
+    assert (cache.extracted, cache.reused) == (1, 1)
+    [entry] = cache.take_updates()
+    assert entry["etag"] == f'"{len(PAGES["/local-plan"])}"'
+    assert cache.take_updates() == []
+
+
+def test_fetch_links_reuses_links_when_content_is_unchanged(council):
+    url = f"{council}/local-plan"
+    with make_session(retries=0) as session:
+        documents, pages = fetch_links(session, url)
+        # a server that ignores If-None-Match sends the same body back
+        cache = PageCache(
+            [
+                {
+                    "url": url,
+                    "etag": None,
+                    "last_modified": None,
+                    "content_hash": hashlib.sha256(
+                        PAGES["/local-plan"].encode("windows-1252")
+                    ).hexdigest(),
+                    "documents": [["Cached", "https://council.example/cached.pdf"]],
+                    "pages": [],
+                }
+            ]
+        )
+        cached = fetch_links(session, url, cache)
+
+    assert documents == [["Local Plan", f"{council}/files/local-plan.pdf"]]
+    assert pages == [f"{council}/local-plan/evidence"]
+    assert cached == ([["Cached", "https://council.example/cached.pdf"]], [])
+    assert cache.reused == 1
+
+
+def test_host_limiter_spaces_requests_to_a_host():
+    limiter = HostLimiter(per_host=1, delay=0.05)
+    started = time.monotonic()
+    for _ in range(3):
+        with limiter.limit("https://council.example/page"):
+            pass
+    with limiter.limit("https://other.example/page"):
+        pass
+
+    assert time.monotonic() - started >= 0.1
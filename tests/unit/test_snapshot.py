@@ -0,0 +1,112 @@
+import hashlib
+import io
+import json
+import tarfile
+from types import SimpleNamespace
+
+import pytest
+
+from application.models import Organisation
+from application.snapshot import (
+    SNAPSHOT_FORMAT,
+    HashingReader,
+    SnapshotError,
+    load_snapshot,
+    read_manifest,
+)
+
+CSV = b"organisation,name\nlocal-authority:ADU,Adur\n"
+
+
+def build_snapshot(path, manifest=None, files=None):
+    with tarfile.open(path, "w:gz") as tar:
+        members = dict(files or {})
+        if manifest is not None:
+            members["manifest.json"] = json.dumps(manifest).encode()
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return path
+
+
+def organisation_manifest(sha256):
+    return {
+        "format": SNAPSHOT_FORMAT,
+        "tables": {
+            Organisation.__table__.name: {
+                "file": "organisation.csv",
+                "columns": ["organisation", "name"],
+                "key": ["organisation"],
+                "rows": 1,
+                "sha256": sha256,
+            }
+        },
+    }
+
+
+class FakeCursor:
+    """Reads COPY input the way psycopg2 does, without a database"""
+
+    rowcount = 1
+
+    def execute(self, sql):
+        pass
+
+    def copy_expert(self, sql, file):
+        while file.read(8192):
+            pass
+
+
+def fake_connection():
+    return SimpleNamespace(connection=SimpleNamespace(cursor=FakeCursor))
+
+
+def test_read_manifest_rejects_a_snapshot_without_a_manifest(tmp_path):
+    path = build_snapshot(tmp_path / "snapshot.tar.gz", files={"a.csv": CSV})
+
+    with tarfile.open(path, "r:gz") as tar:
+        with pytest.raises(SnapshotError, match="no manifest.json"):
+            read_manifest(tar)
+
+
+def test_read_manifest_rejects_other_formats(tmp_path):
+    path = build_snapshot(
+        tmp_path / "snapshot.tar.gz", manifest={"format": SNAPSHOT_FORMAT + 1}
+    )
+
+    with tarfile.open(path, "r:gz") as tar:
+        with pytest.raises(SnapshotError, match="not supported"):
+            read_manifest(tar)
+
+
+def test_hashing_reader_hashes_what_is_read(tmp_path):
+    path = build_snapshot(tmp_path / "snapshot.tar.gz", files={"a.csv": CSV})
+
+    with tarfile.open(path, "r:gz") as tar:
+        reader = HashingReader(tar.extractfile("a.csv"))
+        while reader.read(7):
+            pass
+
+    assert reader.sha256.hexdigest() == hashlib.sha256(CSV).hexdigest()
+
+
+def test_load_snapshot_accepts_a_matching_checksum(tmp_path):
+    path = build_snapshot(
+        tmp_path / "snapshot.tar.gz",
+        manifest=organisation_manifest(hashlib.sha256(CSV).hexdigest()),
+        files={"organisation.csv": CSV},
+    )
+
+    assert load_snapshot(fake_connection(), path) == {"organisation": 1}
+
+
+def test_load_snapshot_detects_a_checksum_mismatch(tmp_path):
+    path = build_snapshot(
+        tmp_path / "snapshot.tar.gz",
+        manifest=organisation_manifest(hashlib.sha256(CSV).hexdigest()),
+        files={"organisation.csv": CSV.replace(b"Adur", b"Arun")},
+    )
+
+    with pytest.raises(SnapshotError, match="Checksum mismatch for organisation.csv"):
+        load_snapshot(fake_connection(), path)
@@ -0,0 +1,45 @@
+from pathlib import Path
+
+from shapely import from_wkt, to_wkb
+
+from application.spatial import build_snapshot
+
+test_data = Path(__file__).parent.parent / "test_data"
+
+
+def test_snapshot_returns_boundaries_covering_point():
+    square = "POLYGON ((0 0, 10 0, 10 10, 0 10, 0 0))"
+    inner = {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "geometry": {
+                    "type": "Polygon",
+                    "coordinates": [[[2, 2], [4, 2], [4, 4], [2, 4], [2, 2]]],
+                },
+                "properties": {},
+            }
+        ],
+    }
+    snapshot = build_snapshot(
+        [
+            ("square", square, None, None),
+            ("inner", None, inner, None),
+            ("empty", None, None, None),
+        ]
+    )
+
+    assert len(snapshot) == 2
+    assert snapshot.query(3, 3) == ["inner", "square"]
+    assert snapshot.query(8, 8) == ["square"]
+    assert snapshot.query(20, 20) == []
+
+
+def test_snapshot_with_real_boundary():
+    wkt = (test_data / "adur.wkt").read_text()
+    snapshot = build_snapshot([("adur", None, None, to_wkb(from_wkt(wkt)))])
+
+    x, y = snapshot.geometries[0].representative_point().coords[0]
+    assert snapshot.query(x, y) == ["adur"]
+    assert snapshot.query(0, 0) == []